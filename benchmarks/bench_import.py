@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Cold import time of the completer modules.
+
+Every sample imports the module in a fresh interpreter, so nothing is shared
+with earlier samples except the OS file cache. Also reports how many library
+keyword files were read by the import, which should be none: they are only
+loaded once a suite imports the library.
+
+Where ycmd is not installed a stub of the ycmd modules the completer imports
+is put on the path, so that its own import is still measured.
+
+    python benchmarks/bench_import.py [--modules robotfw_parser,robotfw_completer]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+ROBOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot')
+
+# Modules of ycmd the completer imports, with what it uses of them at import
+YCMD_STUB = {
+    'ycmd/__init__.py' : '',
+    'ycmd/responses.py' : '',
+    'ycmd/utils.py' : '',
+    'ycmd/completers/__init__.py' : '',
+    'ycmd/completers/completer.py' : 'class Completer(object):\n    pass\n',
+}
+
+SAMPLE = '''
+import json, sys, time
+sys.path.insert(0, {robot_dir!r})
+sys.path.append({stub_dir!r})
+start = time.time()
+try:
+    import {module}
+except ImportError as e:
+    print(json.dumps({{'error': str(e)}}))
+    sys.exit(0)
+elapsed = time.time() - start
+from robotfw_libraries import library_keywords
+print(json.dumps({{'elapsed': elapsed, 'libraries': len(library_keywords.loaded())}}))
+'''
+
+
+def write_ycmd_stub(directory):
+    for name, source in YCMD_STUB.items():
+        path = os.path.join(directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        with open(path, 'w') as f:
+            f.write(source)
+
+
+def sample(module, stub_dir):
+    script = SAMPLE.format(robot_dir=ROBOT_DIR, stub_dir=stub_dir, module=module)
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--modules', default='robotfw_parser,robotfw_server,robotfw_completer',
+                            help='comma separated modules to import')
+    arg_parser.add_argument('--repeat', type=int, default=15)
+    args = arg_parser.parse_args()
+
+    print('{0:>20} {1:>10} {2:>10} {3:>10}'.format('module', 'min ms', 'median ms', 'libraries'))
+
+    stub_dir = tempfile.mkdtemp(prefix='robotfw-bench-')
+    try:
+        write_ycmd_stub(stub_dir)
+
+        for module in args.modules.split(','):
+            samples = [sample(module, stub_dir) for _ in range(args.repeat)]
+
+            errors = [s['error'] for s in samples if 'error' in s]
+            if errors:
+                print('{0:>20} {1}'.format(module, 'skipped: ' + errors[0]))
+                continue
+
+            times = [s['elapsed'] * 1000 for s in samples]
+            print('{0:>20} {1:>10.2f} {2:>10.2f} {3:>10}'.format(
+                module, min(times), median(times), max(s['libraries'] for s in samples)))
+    finally:
+        shutil.rmtree(stub_dir)
+
+
+if __name__ == '__main__':
+    main()
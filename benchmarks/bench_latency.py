@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Parse and completion latency on synthetic workspaces, as JSON.
+
+For every format, generates a workspace (see workspace.py) and measures:
+
+  cold_parse     parsing a suite with empty resource caches
+  warm_start     loading the resource index saved after the cold parses and
+                 parsing a suite, as on the first parse after a restart
+  warm_reparse   updating a parsed suite after a one line edit, including
+                 rebuilding its candidate indexes, as the parse worker does
+  candidates     candidates() at every column of a keyword, a variable and a
+                 tag cell, as when the cell is typed one key at a time
+
+Latencies are reported as p50/p95/p99 in milliseconds, together with the
+peak memory of the process, so that runs can be compared over time:
+
+    python benchmarks/bench_latency.py --output latency.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot'))
+
+from robotfw_cache import resource_cache
+from robotfw_parser import RobotFrameworkParser, load_resource_index, save_resource_index
+from robotfw_resolver import resource_resolver
+from workspace import FORMATS, format_row, generate_workspace
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def percentiles(samples):
+    """ p50/p95/p99 of samples in seconds, in milliseconds """
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * len(ordered) + 0.5)) - 1)] * 1000
+
+    return {
+        'samples' : len(ordered),
+        'p50_ms' : rank(50),
+        'p95_ms' : rank(95),
+        'p99_ms' : rank(99),
+        'max_ms' : ordered[-1] * 1000,
+    }
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+def cold_parse(workspace, repeat):
+    samples = []
+    parsers = {}
+
+    for _ in range(repeat):
+        for path, contents in sorted(workspace.suites.items()):
+            resource_cache.clear()
+            resource_resolver.clear()
+            gc.collect()
+
+            elapsed, parsers[path] = timed(RobotFrameworkParser, path, contents)
+            samples.append(elapsed)
+
+    return samples, parsers
+
+
+def warm_start(workspace, index_file, repeat):
+    samples = []
+    save_resource_index(index_file)
+
+    def start(path, contents):
+        load_resource_index(index_file)
+        return RobotFrameworkParser(path, contents)
+
+    for _ in range(repeat):
+        for path, contents in sorted(workspace.suites.items()):
+            resource_cache.clear()
+            resource_resolver.clear()
+            gc.collect()
+
+            elapsed, _ = timed(start, path, contents)
+            samples.append(elapsed)
+
+    return samples
+
+
+def warm_reparse(workspace, parsers, edits):
+    samples = []
+
+    def reparse(parser, contents):
+        parser = parser.updated(contents)
+        parser._candidate_indexes()
+        return parser
+
+    for path, contents in sorted(workspace.suites.items()):
+        lines = contents.splitlines()
+
+        for n in range(edits):
+            # Type into the last step of the suite, then undo
+            edited = list(lines)
+            edited[-1] = edited[-1] + str(n % 10)
+
+            for version in (edited, lines):
+                elapsed, parsers[path] = timed(reparse, parsers[path], '\n'.join(version) + '\n')
+                samples.append(elapsed)
+
+    return samples
+
+
+def typed_lines(file_format):
+    """ Lines typed during the benchmark, with the column typing starts at """
+    lines = [
+        format_row(['', 'Keyword 3 Of Resource 0 0'], file_format),
+        format_row(['', 'Log', '${VAR_0_0_1}'], file_format),
+        format_row(['', '[Tags]', 'tag-1'], file_format),
+    ]
+
+    for line in lines:
+        yield line, len(line) - len(line.lstrip('| \t'))
+
+
+def candidates(workspace, parsers, limit):
+    samples = []
+
+    for path in sorted(workspace.suites):
+        parser = parsers[path]
+        line_num = len(workspace.suites[path].splitlines())
+
+        for line, start in typed_lines(workspace.format):
+            for column in range(start + 1, len(line.rstrip('| ')) + 1):
+                elapsed, _ = timed(parser.candidates, line, line_num, column, limit)
+                samples.append(elapsed)
+
+    return samples
+
+
+def peak_memory():
+    peak = {'traced_bytes' : None, 'max_rss_kb' : None}
+
+    if tracemalloc and tracemalloc.is_tracing():
+        peak['traced_bytes'] = tracemalloc.get_traced_memory()[1]
+
+    if resource:
+        peak['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak
+
+
+def run(args, file_format):
+    directory = tempfile.mkdtemp(prefix='robotfw-bench-')
+    try:
+        workspace = generate_workspace(directory, args.suites, args.depth, args.fanout,
+                                       args.keywords, args.variables, args.tags, file_format)
+
+        if tracemalloc:
+            tracemalloc.start()
+
+        cold_samples, parsers = cold_parse(workspace, args.repeat)
+        memory = peak_memory()
+
+        if tracemalloc:
+            tracemalloc.stop()
+
+        return {
+            'files' : len(workspace.suites) + len(workspace.resources),
+            'cold_parse' : percentiles(cold_samples),
+            'warm_start' : percentiles(warm_start(workspace, os.path.join(directory, 'resources.index'),
+                                                  args.repeat)),
+            'warm_reparse' : percentiles(warm_reparse(workspace, parsers, args.edits)),
+            'candidates' : percentiles(candidates(workspace, parsers, args.limit or None)),
+            'peak_memory' : memory,
+        }
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--formats', default=','.join(FORMATS),
+                            help='comma separated formats to benchmark')
+    arg_parser.add_argument('--suites', type=int, default=10)
+    arg_parser.add_argument('--depth', type=int, default=3, help='levels of resource imports')
+    arg_parser.add_argument('--fanout', type=int, default=3, help='resources imported by every file')
+    arg_parser.add_argument('--keywords', type=int, default=20, help='keywords and test cases per file')
+    arg_parser.add_argument('--variables', type=int, default=10, help='variables per resource')
+    arg_parser.add_argument('--tags', type=int, default=5, help='tags per suite')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='cold parses of every suite')
+    arg_parser.add_argument('--edits', type=int, default=10, help='edits of every suite')
+    arg_parser.add_argument('--limit', type=int, default=100,
+                            help='most candidates per request, 0 for all, as robotframework_max_candidates')
+    arg_parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    report = {
+        'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python' : platform.python_version(),
+        'config' : dict((name, getattr(args, name))
+                        for name in ('suites', 'depth', 'fanout', 'keywords', 'variables', 'tags',
+                                     'repeat', 'edits', 'limit')),
+        'results' : dict((file_format, run(args, file_format)) for file_format in args.formats.split(',')),
+    }
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
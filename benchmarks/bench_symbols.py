@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Memory of the symbol tables and candidate indexes of a large workspace.
+
+Generates a workspace of resource files defining about 20k user keywords and
+variables, imported by one suite, and builds the suite's candidate indexes.
+Compares the size of the candidates as Symbol records against the
+{'name', 'type', 'class'} dicts used before, and reports the index build time.
+
+Sizes are measured by walking the objects with sys.getsizeof, counting every
+object once, so strings shared by both representations are not double counted.
+
+    python benchmarks/bench_symbols.py [--symbols 20000] [--resources 40]
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot'))
+
+from robotfw_parser import RobotFrameworkParser
+
+
+def generate_workspace(directory, symbol_count, resource_count):
+    """ Write the resources and the suite importing them, returns the suite's path and contents """
+    per_resource = max(1, symbol_count // (2 * resource_count))
+    settings = ['*** Settings ***']
+
+    for r in range(resource_count):
+        lines = ['*** Variables ***']
+        lines.extend('${{VAR_{0}_{1}}}    value'.format(r, n) for n in range(per_resource))
+        lines.append('')
+        lines.append('*** Keywords ***')
+        for n in range(per_resource):
+            lines.append('Keyword {0} Of Resource {1}'.format(n, r))
+            lines.append('    Log    ${{VAR_{0}_{1}}}'.format(r, n))
+
+        filename = 'resource{0}.robot'.format(r)
+        with open(os.path.join(directory, filename), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        settings.append('Resource    {0}'.format(filename))
+
+    contents = '\n'.join(settings + ['', '*** Test Cases ***', 'Test', '    Log    done']) + '\n'
+    path = os.path.join(directory, 'suite.robot')
+    with open(path, 'w') as f:
+        f.write(contents)
+
+    return path, contents
+
+
+def deep_size(root, seen=None):
+    """ Bytes of root and everything it references, each object counted once """
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [root]
+
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or obj is None or isinstance(obj, (int, float, bool)):
+            continue
+
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, '__slots__'):
+            stack.extend(getattr(obj, slot, None) for slot in obj.__slots__)
+
+    return size
+
+
+def as_dicts(symbols):
+    """ The candidates in their former representation """
+    return [{'name' : symbol.name, 'type' : symbol.type, 'class' : symbol.label} for symbol in symbols]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--symbols', type=int, default=20000)
+    arg_parser.add_argument('--resources', type=int, default=40)
+    args = arg_parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='robotfw-bench-')
+    try:
+        path, contents = generate_workspace(directory, args.symbols, args.resources)
+
+        gc.collect()
+        start = time.time()
+        parser = RobotFrameworkParser(path, contents)
+        parsed = time.time()
+        indexes = parser._candidate_indexes()
+        indexed = time.time()
+
+        symbols = list(indexes['keyword']) + list(indexes['variable'])
+        names = set(id(symbol.name) for symbol in symbols)
+
+        # Names are shared by both representations, count them as seen
+        records = deep_size(symbols, set(names))
+        dicts = deep_size(as_dicts(symbols), set(names))
+
+        print('symbols            {0:>10}'.format(len(symbols)))
+        print('parse ms           {0:>10.1f}'.format((parsed - start) * 1000))
+        print('index build ms     {0:>10.1f}'.format((indexed - parsed) * 1000))
+        print('dict candidates    {0:>10} B  {1:>6.1f} B / symbol'.format(dicts, float(dicts) / len(symbols)))
+        print('Symbol records     {0:>10} B  {1:>6.1f} B / symbol'.format(records, float(records) / len(symbols)))
+        print('saved              {0:>10.1f} %'.format(100.0 * (dicts - records) / dicts))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
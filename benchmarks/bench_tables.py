@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Parse time and memory of RobotFrameworkParser on files with many tables.
+
+Generates synthetic suites with an increasing number of small tables and
+reports the parse time per table and the peak memory allocated while
+parsing. Both should stay flat as the table count grows.
+
+    python benchmarks/bench_tables.py [--tables 500,1000,2000,4000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot'))
+
+from robotfw_parser import RobotFrameworkParser
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+TABLE_TEMPLATES = [
+    ['| *** Settings *** |',
+     '| Library | Collections |',
+     '| Force Tags | tag{0} |'],
+    ['| *** Variables *** |',
+     '| ${{VAR{0}}} | value |'],
+    ['| *** Test Cases *** |',
+     '| Test {0} |',
+     '| | [Tags] | test-tag{0} |',
+     '| | Keyword {0} |'],
+    ['| *** Keywords *** |',
+     '| Keyword {0} |',
+     '| | Log | ${{VAR{0}}} |'],
+]
+
+
+def generate_suite(table_count):
+    lines = []
+    for n in range(table_count):
+        template = TABLE_TEMPLATES[n % len(TABLE_TEMPLATES)]
+        lines.extend(line.format(n) for line in template)
+        lines.append('')
+
+    return '\n'.join(lines)
+
+
+def measure(contents, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.time()
+        RobotFrameworkParser('/bench/suite.robot', contents)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    peak = None
+    if tracemalloc:
+        gc.collect()
+        tracemalloc.start()
+        RobotFrameworkParser('/bench/suite.robot', contents)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--tables', default='500,1000,2000,4000,8000',
+                            help='comma separated table counts')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print('{0:>8} {1:>8} {2:>10} {3:>12} {4:>14}'.format(
+        'tables', 'lines', 'parse ms', 'us / table', 'peak B / line'))
+
+    for table_count in [int(n) for n in args.tables.split(',')]:
+        contents = generate_suite(table_count)
+        line_count = contents.count('\n') + 1
+
+        elapsed, peak = measure(contents, args.repeat)
+
+        print('{0:>8} {1:>8} {2:>10.2f} {3:>12.2f} {4:>14}'.format(
+            table_count, line_count, elapsed * 1000, elapsed * 1e6 / table_count,
+            '{0:.1f}'.format(float(peak) / line_count) if peak is not None else 'n/a'))
+
+
+if __name__ == '__main__':
+    main()
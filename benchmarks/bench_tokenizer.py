@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Throughput of the tokenizers and the parser in the pipe, space and TSV formats.
+
+The same synthetic suite is written in each format and tokenized, and then
+parsed, repeatedly. Reports lines and megabytes per second; the formats
+should be within a small factor of each other.
+
+    python benchmarks/bench_tokenizer.py [--tables 2000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot'))
+
+from bench_tables import generate_suite
+from robotfw_parser import RobotFrameworkParser
+from robotfw_tokenizer import pipe_tokenizer, space_tokenizer, tsv_tokenizer
+
+
+FORMATS = [
+    ('pipe', '/bench/suite.robot', pipe_tokenizer, ' | ', '| {0} |'),
+    ('space', '/bench/suite.robot', space_tokenizer, '    ', '{0}'),
+    ('tsv', '/bench/suite.tsv', tsv_tokenizer, '\t', '{0}'),
+]
+
+
+def convert(pipe_contents, separator, row):
+    """ The pipe separated suite written with another separator """
+    lines = []
+    for line in pipe_contents.splitlines():
+        cells = pipe_tokenizer.cells(line)
+        lines.append(row.format(separator.join(cells)) if cells is not None else '')
+
+    return '\n'.join(lines)
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--tables', type=int, default=2000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    pipe_contents = generate_suite(args.tables)
+
+    print('{0:>6} {1:>8} {2:>16} {3:>10} {4:>16} {5:>10}'.format(
+        'format', 'lines', 'tokenize lines/s', 'MB/s', 'parse lines/s', 'MB/s'))
+
+    for name, filename, tokenizer, separator, row in FORMATS:
+        contents = convert(pipe_contents, separator, row)
+        lines = contents.splitlines()
+        megabytes = len(contents) / 1e6
+
+        tokenize = best_of(args.repeat, lambda: sum(1 for _ in tokenizer.iter_cells(lines)))
+        parse = best_of(args.repeat, lambda: RobotFrameworkParser(filename, contents))
+
+        print('{0:>6} {1:>8} {2:>16.0f} {3:>10.2f} {4:>16.0f} {5:>10.2f}'.format(
+            name, len(lines), len(lines) / tokenize, megabytes / tokenize,
+            len(lines) / parse, megabytes / parse))
+
+
+if __name__ == '__main__':
+    main()
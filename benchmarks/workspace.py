@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Synthetic Robot Framework workspaces for the benchmarks.
+
+A workspace is a set of suites that each import the roots of a resource
+tree. Every resource imports `fanout` resources of the next level down to
+`depth` levels, and every file defines the given number of keywords,
+variables and tags. All files are written in one of the three formats.
+"""
+
+import os
+
+
+FORMATS = ('pipe', 'space', 'tsv')
+
+_EXTENSIONS = {'pipe' : '.robot', 'space' : '.robot', 'tsv' : '.tsv'}
+
+
+def format_row(cells, file_format):
+    """ A row of cells in file_format """
+    if file_format == 'pipe':
+        return '| ' + ' | '.join(cells) + ' |'
+    elif file_format == 'space':
+        return '    '.join(cells)
+
+    return '\t'.join(cells)
+
+
+def format_header(table, file_format):
+    if file_format == 'pipe':
+        return '| *** {0} *** |'.format(table)
+    elif file_format == 'space':
+        return '*** {0} ***'.format(table)
+
+    return '*{0}*'.format(table)
+
+
+class Workspace():
+    """ A generated workspace, see generate_workspace() """
+
+    def __init__(self, directory, file_format):
+        self.directory = directory
+        self.format = file_format
+        # path -> contents
+        self.suites = {}
+        self.resources = {}
+
+
+def generate_workspace(directory, suites=10, depth=3, fanout=3, keywords=20, variables=10, tags=5,
+                       file_format='space'):
+    """ Write a workspace below directory and return its Workspace """
+    workspace = Workspace(directory, file_format)
+    extension = _EXTENSIONS[file_format]
+
+    def write(path, rows):
+        contents = '\n'.join(rows) + '\n'
+        with open(path, 'w') as f:
+            f.write(contents)
+        return contents
+
+    def resource_name(level, number):
+        return os.path.join('resources', 'level{0}'.format(level), 'resource{0}{1}'.format(number, extension))
+
+    os.makedirs(os.path.join(directory, 'resources'))
+    level_sizes = [fanout ** level for level in range(1, depth + 1)]
+
+    for level, size in enumerate(level_sizes):
+        os.makedirs(os.path.join(directory, 'resources', 'level{0}'.format(level)))
+
+        for number in range(size):
+            rows = [format_header('Settings', file_format),
+                    format_row(['Library', 'Collections'], file_format)]
+
+            if level + 1 < depth:
+                for child in range(number * fanout, (number + 1) * fanout):
+                    # Paths are relative to the resources directory, found by the upward search
+                    rows.append(format_row(['Resource', resource_name(level + 1, child)], file_format))
+
+            rows.append('')
+            rows.append(format_header('Variables', file_format))
+            rows.extend(format_row(['${{VAR_{0}_{1}_{2}}}'.format(level, number, n), 'value'], file_format)
+                        for n in range(variables))
+
+            rows.append('')
+            rows.append(format_header('Keywords', file_format))
+            for n in range(keywords):
+                rows.append(format_row(['Keyword {0} Of Resource {1} {2}'.format(n, level, number)], file_format))
+                rows.append(format_row(['', 'Log', '${{VAR_{0}_{1}_{2}}}'.format(level, number, n % max(variables, 1))],
+                                       file_format))
+
+            path = os.path.join(directory, resource_name(level, number))
+            workspace.resources[path] = write(path, rows)
+
+    for number in range(suites):
+        rows = [format_header('Settings', file_format),
+                format_row(['Library', 'OperatingSystem'], file_format),
+                format_row(['Force Tags', 'suite-{0}'.format(number)], file_format)]
+
+        for root in range(fanout if depth else 0):
+            rows.append(format_row(['Resource', resource_name(0, root)], file_format))
+
+        rows.append('')
+        rows.append(format_header('Test Cases', file_format))
+        for n in range(keywords):
+            rows.append(format_row(['Test {0} Of Suite {1}'.format(n, number)], file_format))
+            rows.append(format_row(['', '[Tags]'] + ['tag-{0}'.format(t) for t in range(n % max(tags, 1), tags)],
+                                   file_format))
+            rows.append(format_row(['', 'Keyword {0} Of Resource 0 0'.format(n % max(keywords, 1))], file_format))
+
+        path = os.path.join(directory, 'suite{0}{1}'.format(number, extension))
+        workspace.suites[path] = write(path, rows)
+
+    return workspace
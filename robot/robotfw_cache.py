@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+
+import collections
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from robotfw_stats import stats
+
+
+_logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_ENTRIES = 512
+
+# Bump when the layout of saved index files changes, older files are ignored.
+# Pickles of Python 2 and 3 strings differ, so the major version is part of it.
+INDEX_VERSION = (3, sys.version_info[0])
+
+
+class _CacheEntry():
+
+    def __init__(self, mtime, size, digest, result, state=None):
+        self.mtime = mtime
+        self.size = size
+        self.digest = digest
+        self.result = result
+        # Saved state of an entry loaded from an index, restored on first use
+        self.state = state
+
+
+class ResourceCache():
+    """ Process wide LRU cache of per-file resource parse results.
+
+    Entries are keyed by the absolute path of the resource file. An entry is
+    reused as long as the file's mtime and size are unchanged; if they differ
+    the file is re-read and only re-parsed when the content hash changed too.
+
+    The entries can be saved to an index file and loaded by a later process,
+    which then only reads the files that changed in between.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        # Bumped whenever an entry is added, changed or dropped
+        self.revision = 0
+        self._saved_revision = 0
+        # Rebuilds the results of entries loaded from an index, see load()
+        self._restore = None
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._entries
+
+
+    @property
+    def dirty(self):
+        """ Whether the entries changed since they were last saved or loaded """
+        return self.revision != self._saved_revision
+
+
+    def get(self, path, factory):
+        """ Return the parse result for the file at path.
+
+        factory is called as factory(path, contents) when the file has to be
+        (re-)parsed. Returns None if the file can not be stat'ed.
+        """
+        key = os.path.abspath(path)
+
+        try:
+            st = os.stat(key)
+        except OSError:
+            self.discard(key)
+            return None
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+
+        if entry and entry.mtime == st.st_mtime and entry.size == st.st_size:
+            result = self._result(key, entry)
+            if result is not None:
+                self.hits += 1
+                return result
+
+        with stats.timer('resource_read'):
+            with open(key, 'r') as f:
+                contents = f.read()
+
+            # Files are read as text, which is only bytes on Python 2
+            digest = hashlib.sha1(contents if isinstance(contents, bytes) else contents.encode('utf-8')).hexdigest()
+
+        result = self._result(key, entry) if entry and entry.digest == digest else None
+        if result is not None:
+            _logger.info('Resource {0} touched but unchanged'.format(key))
+            entry.mtime = st.st_mtime
+            entry.size = st.st_size
+            self.hits += 1
+            self.revision += 1
+            return result
+
+        _logger.info('Parsing resource {0}'.format(key))
+        result = factory(key, contents)
+        self.misses += 1
+
+        with self._lock:
+            self._entries[key] = _CacheEntry(st.st_mtime, st.st_size, digest, result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.revision += 1
+
+        return result
+
+
+    def _result(self, key, entry):
+        """ Result of entry, restored first if it was loaded from an index. None
+        if that fails, the file is then parsed again. """
+        with self._lock:
+            if entry.state is not None:
+                state, entry.state = entry.state, None
+                try:
+                    entry.result = self._restore(key, state)
+                except Exception as e:
+                    _logger.error('Could not restore {0} from the resource index: {1}'.format(key, e))
+
+            return entry.result
+
+
+    def discard(self, path):
+        with self._lock:
+            if self._entries.pop(os.path.abspath(path), None) is not None:
+                self.revision += 1
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.revision += 1
+
+
+    def save(self, path, dump):
+        """ Write the entries to the index file at path.
+
+        dump(result) returns the picklable state of a result. The file is
+        written next to path and renamed over it, so a reader never sees a
+        partial index.
+        """
+        with self._lock:
+            revision = self.revision
+            entries = [(key, entry.mtime, entry.size, entry.digest, entry.result, entry.state)
+                       for key, entry in self._entries.items()]
+
+        # Entries never used since they were loaded are saved as they were
+        index = {
+            'version' : INDEX_VERSION,
+            'entries' : [(key, mtime, size, digest, dump(result) if state is None else state)
+                         for key, mtime, size, digest, result, state in entries],
+        }
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, temp_path = tempfile.mkstemp(prefix='.index-', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pickle.dumps(index, pickle.HIGHEST_PROTOCOL))
+            _replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        self._saved_revision = revision
+        _logger.info('Saved {0} resources to {1}'.format(len(entries), path))
+
+
+    def load(self, path, restore):
+        """ Add the entries saved in the index file at path, returns their number.
+
+        restore(path, state) rebuilds the result of a file from its saved
+        state the first time the entry is used. Loaded entries are validated
+        like any other, so only files changed since the save are read again.
+        Files that are already cached are kept, and a missing, unreadable or
+        outdated index is ignored.
+        """
+        try:
+            with open(path, 'rb') as f:
+                contents = f.read()
+        except (IOError, OSError):
+            return 0
+
+        try:
+            index = pickle.loads(contents)
+        except Exception as e:
+            _logger.error('Ignoring unreadable resource index {0}: {1}'.format(path, e))
+            return 0
+
+        if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+            _logger.info('Ignoring outdated resource index {0}'.format(path))
+            return 0
+
+        loaded = 0
+        with self._lock:
+            self._restore = restore
+
+            # Saved least recently used first, loaded in the same order
+            for key, mtime, size, digest, state in index['entries']:
+                if key not in self._entries:
+                    self._entries[key] = _CacheEntry(mtime, size, digest, None, state)
+                    loaded += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        _logger.info('Loaded {0} resources from {1}'.format(loaded, path))
+        return loaded
+
+
+def index_path(cache_dir, workspace_root=None):
+    """ Path of the resource index in cache_dir, one per workspace root """
+    name = 'resources'
+    if workspace_root:
+        name += '-' + hashlib.sha1(os.path.abspath(workspace_root).encode('utf-8')).hexdigest()[:12]
+
+    return os.path.join(cache_dir, name + '.index')
+
+
+def _replace(source, destination):
+    # os.replace is Python 3 only, and rename does not replace files on Windows
+    replace = getattr(os, 'replace', None)
+    if replace:
+        replace(source, destination)
+        return
+
+    try:
+        os.rename(source, destination)
+    except OSError:
+        os.remove(destination)
+        os.rename(source, destination)
+
+
+resource_cache = ResourceCache()
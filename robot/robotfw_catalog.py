@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+
+import json
+import logging
+import os
+import threading
+
+
+_logger = logging.getLogger(__name__)
+
+
+# Bump when the layout of the database changes, older databases are rebuilt
+SCHEMA_VERSION = 3
+
+SPEC_EXTENSIONS = ('.xml', '.libspec', '.json')
+
+_SCHEMA = [
+    # known is 0 for libraries whose keywords can only be found by importing them
+    'CREATE TABLE libraries (name TEXT PRIMARY KEY, version TEXT, source TEXT, mtime REAL, known INTEGER)',
+    'CREATE TABLE keywords (library TEXT, name TEXT, args TEXT, doc TEXT)',
+    'CREATE INDEX keywords_library ON keywords (library)',
+]
+
+
+class LibraryCatalog():
+    """ Keywords of Robot Framework libraries.
+
+    The catalog is compiled from libdoc spec files (XML or JSON) and from the
+    sources of Python libraries into a sqlite database, by default in memory.
+    Libraries described by specs are cataloged by name. Python sources are
+    cataloged by path, as projects sharing the database may each have their
+    own library of a name.
+    A spec or source file is only read again when its mtime changes, and the
+    keywords of a library are only loaded when a suite imports it.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        # Bumped whenever the keywords of any library change
+        self.revision = 0
+
+        self._spec_dirs = []
+        self._specs_scanned = False
+
+        # library -> keyword names, for the libraries loaded so far
+        self._keywords = {}
+        self._library_names = None
+
+        self._lock = threading.RLock()
+        self._connection = None
+
+
+    def configure(self, path=':memory:', spec_dirs=()):
+        """ Switch to the database at path and the spec files in spec_dirs """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+            self.path = path
+            self._spec_dirs = list(spec_dirs)
+            self._specs_scanned = False
+            self._keywords = {}
+            self._library_names = None
+            self.revision += 1
+
+
+    def library_names(self):
+        """ Names of the libraries described by spec files """
+        with self._lock:
+            if self._library_names is None:
+                # Python sources are cataloged under their own path
+                rows = self._execute('SELECT name FROM libraries WHERE name != source ORDER BY name')
+                self._library_names = [name for name, in rows]
+
+            return self._library_names
+
+
+    def keywords(self, library):
+        """ Keyword names of library, None if the catalog does not know it """
+        with self._lock:
+            if library not in self._keywords:
+                names = None
+                if self._execute('SELECT 1 FROM libraries WHERE name = ? AND known', (library,)):
+                    rows = self._execute('SELECT name FROM keywords WHERE library = ?', (library,))
+                    names = [name for name, in rows]
+
+                self._keywords[library] = names
+
+            return self._keywords[library]
+
+
+    def keyword_info(self, library, keyword):
+        """ (arguments, documentation) of a keyword, None if it is unknown """
+        with self._lock:
+            rows = self._execute('SELECT args, doc FROM keywords WHERE library = ? AND name = ?',
+                                 (library, keyword))
+            for args, doc in rows:
+                return ([_native(arg) for arg in json.loads(args)], doc)
+
+        return None
+
+
+    def ingest_spec(self, spec_path):
+        """ Add the library described by a libdoc XML or JSON spec file """
+        source = os.path.abspath(spec_path)
+        mtime = os.path.getmtime(source)
+
+        if self._is_current(source, mtime):
+            return
+
+        with open(source, 'r') as f:
+            contents = f.read()
+
+        if source.lower().endswith('.json') or contents.lstrip().startswith('{'):
+            library = _parse_json_spec(contents)
+        else:
+            library = _parse_xml_spec(contents)
+
+        self._store(library, source, mtime)
+
+
+    def ingest_python_library(self, module_path):
+        """ Add the keywords found in the source of a Python library, cataloged
+        under the absolute path of the source """
+        source = os.path.abspath(module_path)
+        try:
+            mtime = os.path.getmtime(source)
+        except OSError:
+            return
+
+        if self._is_current(source, mtime):
+            return
+
+        try:
+            with open(source, 'r') as f:
+                library = _parse_python_library(source, f.read())
+
+            if library is None:
+                _logger.info('Keywords of library {0} are only known once it is imported'.format(source))
+                library = {'name' : source, 'keywords' : [], 'known' : False}
+        except Exception as e:
+            # Not valid Python, or not UTF-8 on Python 3
+            _logger.error('Could not read library {0}: {1}'.format(source, e))
+            return
+
+        self._store(library, source, mtime)
+
+
+    def _is_current(self, source, mtime):
+        with self._lock:
+            self._ensure_specs()
+
+            return bool(self._execute('SELECT 1 FROM libraries WHERE source = ? AND mtime = ?', (source, mtime)))
+
+
+    def _store(self, library, source, mtime):
+        name = library['name']
+        _logger.info('Cataloging {0} keywords of {1} from {2}'.format(
+            len(library['keywords']), name, source))
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('DELETE FROM keywords WHERE library = ?', (name,))
+                connection.execute('INSERT OR REPLACE INTO libraries VALUES (?, ?, ?, ?, ?)',
+                                   (name, library.get('version', ''), source, mtime,
+                                    int(library.get('known', True))))
+                connection.executemany('INSERT INTO keywords VALUES (?, ?, ?, ?)',
+                                       [(name, kw['name'], json.dumps(kw['args']), kw['doc'])
+                                        for kw in library['keywords']])
+
+            self._keywords.pop(name, None)
+            self._library_names = None
+            self.revision += 1
+
+
+    def _ensure_specs(self):
+        if self._specs_scanned:
+            return
+
+        self._specs_scanned = True
+
+        for spec_dir in self._spec_dirs:
+            if not os.path.isdir(spec_dir):
+                continue
+
+            for filename in sorted(os.listdir(spec_dir)):
+                if filename.lower().endswith(SPEC_EXTENSIONS):
+                    try:
+                        self.ingest_spec(os.path.join(spec_dir, filename))
+                    except Exception as e:
+                        _logger.error('Could not ingest libdoc spec {0}: {1}'.format(filename, e))
+
+
+    def _execute(self, query, args=()):
+        return self._connect().execute(query, args).fetchall()
+
+
+    def _connect(self):
+        if self._connection is None:
+            # The parsers of the catalog are imported once it is first used
+            import sqlite3
+
+            if self.path != ':memory:':
+                directory = os.path.dirname(os.path.abspath(self.path))
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            if str is bytes:
+                # The parser works on UTF-8 encoded byte strings on Python 2,
+                # names of the catalog are compared and sorted with them
+                self._connection.text_factory = str
+
+            version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+            if version != SCHEMA_VERSION:
+                _logger.info('Creating library catalog {0}'.format(self.path))
+                with self._connection:
+                    self._connection.execute('DROP TABLE IF EXISTS libraries')
+                    self._connection.execute('DROP TABLE IF EXISTS keywords')
+                    for statement in _SCHEMA:
+                        self._connection.execute(statement)
+                    self._connection.execute('PRAGMA user_version = {0}'.format(SCHEMA_VERSION))
+
+            self._specs_scanned = False
+            self._ensure_specs()
+
+        return self._connection
+
+
+def _native(text):
+    """ text as the parser's strings are, UTF-8 encoded on Python 2 """
+    if str is bytes and not isinstance(text, str):
+        return text.encode('utf-8')
+
+    return text
+
+
+def _parse_xml_spec(contents):
+    import xml.etree.ElementTree as ElementTree
+
+    root = ElementTree.fromstring(contents)
+
+    keywords = []
+    for kw in root.iter('kw'):
+        args = []
+        for arg in kw.iter('arg'):
+            # Robot Framework 4 puts the argument in attributes and children
+            text = arg.get('repr') or arg.text or arg.findtext('name') or ''
+            args.append(text.strip())
+
+        keywords.append({
+            'name' : kw.get('name'),
+            'args' : args,
+            'doc' : kw.findtext('doc') or '',
+        })
+
+    return {
+        'name' : root.get('name'),
+        'version' : root.findtext('version') or root.get('version') or '',
+        'keywords' : keywords,
+    }
+
+
+def _parse_json_spec(contents):
+    spec = json.loads(contents)
+
+    keywords = []
+    for kw in spec.get('keywords', []):
+        args = [arg.get('repr', arg.get('name', '')) if isinstance(arg, dict) else arg
+                for arg in kw.get('args', [])]
+        keywords.append({'name' : kw['name'], 'args' : args, 'doc' : kw.get('doc', '')})
+
+    return {
+        'name' : spec['name'],
+        'version' : spec.get('version', ''),
+        'keywords' : keywords,
+    }
+
+
+def _parse_python_library(name, source):
+    """ Keywords of a Python library, found without importing it.
+
+    Public module level functions are keywords, and so are the public methods
+    of a class named like the module, as Robot Framework does when importing.
+    None when the keywords can only be known by importing the library: the
+    class has base classes, the library implements the dynamic or hybrid API
+    with get_keyword_names, or the module star imports names.
+    """
+    import ast
+
+    module = ast.parse(source)
+    class_name = os.path.splitext(os.path.basename(name))[0]
+
+    functions = []
+    for node in module.body:
+        if isinstance(node, ast.ImportFrom) and any(alias.name == '*' for alias in node.names):
+            return None
+        elif isinstance(node, ast.FunctionDef):
+            functions.append((node, False))
+        elif isinstance(node, ast.ClassDef) and node.name == class_name:
+            if any(getattr(base, 'id', None) != 'object' for base in node.bases):
+                return None
+
+            functions = [(child, True) for child in node.body if isinstance(child, ast.FunctionDef)]
+            break
+
+    if any(function.name == 'get_keyword_names' for function, _ in functions):
+        return None
+
+    keywords = []
+    for function, is_method in functions:
+        if function.name.startswith('_'):
+            continue
+
+        args = [_arg_name(arg) for arg in function.args.args]
+        if is_method and args:
+            args = args[1:]
+
+        keywords.append({
+            'name' : _keyword_name(function),
+            'args' : args,
+            'doc' : ast.get_docstring(function) or '',
+        })
+
+    return {'name' : name, 'keywords' : keywords}
+
+
+def _keyword_name(function):
+    import ast
+
+    # A name given with the robot.api.deco.keyword decorator wins, as
+    # @keyword('Name') or @keyword(name='Name')
+    for decorator in function.decorator_list:
+        if not isinstance(decorator, ast.Call):
+            continue
+
+        if getattr(decorator.func, 'id', getattr(decorator.func, 'attr', None)) != 'keyword':
+            continue
+
+        names = decorator.args[:1] + [kw.value for kw in decorator.keywords if kw.arg == 'name']
+        for node in names:
+            name = _string(node)
+            if name:
+                return name
+
+    return ' '.join(word[0].upper() + word[1:] for word in function.name.split('_') if word)
+
+
+def _string(node):
+    """ Value of a string literal node, None for other nodes """
+    import ast
+
+    constant = getattr(ast, 'Constant', None)
+    if constant is not None and isinstance(node, constant):
+        value = node.value
+    else:
+        # String literals are ast.Str before Python 3.8
+        value = getattr(node, 's', None)
+
+    return value if isinstance(value, (str, type(u''))) else None
+
+
+def _arg_name(arg):
+    # ast.Name on Python 2, ast.arg on Python 3
+    return getattr(arg, 'id', None) or getattr(arg, 'arg', '')
+
+
+library_catalog = LibraryCatalog()
+
+
+def catalog_path(cache_dir):
+    """ Path of the library catalog in cache_dir """
+    return os.path.join(cache_dir, 'libraries.sqlite')
+
+
+def configure_library_catalog(path=None, spec_dirs=None):
+    """ Keep the catalog in the sqlite file at path and ingest the libdoc specs in spec_dirs """
+    library_catalog.configure(path or ':memory:', spec_dirs or [])
@@ -1,15 +1,28 @@
 #!/usr/bin/env python
 
+import collections
+import itertools
 import json
 import logging
 import os
 import subprocess
+import sys
+import tempfile
+import threading
+import time
 
 from ycmd import responses
 from ycmd import utils
 from ycmd.completers.completer import Completer
 
-from robotfw_parser import RobotFrameworkParser
+from robotfw_cache import index_path
+from robotfw_catalog import catalog_path, configure_library_catalog
+from robotfw_graph import resource_graph
+from robotfw_lines import LineTable
+from robotfw_parser import configure_resource_loading
+from robotfw_resolver import resource_resolver
+from robotfw_symbols import Symbol
+from robotfw_worker import DEFAULT_MAX_PARSERS, ParseWorker
 
 ROBOTFW_FILETYPES = set( [ 'robot' ] )
 COMPLETION_ERROR_MESSAGE = 'There was a completion error.'
@@ -17,6 +30,29 @@ PARSE_ERROR_MESSAGE = 'There was a parse error.'
 NO_COMPLETIONS_MESSAGE = 'RF parser produced an empty JSON response.'
 ROBOTFW_PANIC_MESSAGE = ( 'RF parser panicked trying to find completions, ' +
                           'you likely have a syntax error.' )
+SERVER_NOT_RUNNING_MESSAGE = 'RF parser server is not running.'
+SERVER_TIMEOUT_MESSAGE = 'RF parser server did not answer in time.'
+
+SERVER_SCRIPT = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                              'robotfw_server.py' )
+# Seconds to wait for the server to answer a query. It answers from the last
+# finished parse, so this only expires if the server is wedged.
+SERVER_TIMEOUT = 0.5
+# Seconds before the RF parser server is started again after it exited on
+# its own, doubled with every exit in a row up to SERVER_MAX_BACKOFF
+SERVER_BACKOFF = 1
+SERVER_MAX_BACKOFF = 300
+# Lines of the log of a server that exited reported with the exit
+SERVER_LOG_LINES = 20
+# Seconds the RF parser server waits for the parse OnFileReadyToParse queued
+# before it replies with the diagnostics of the previous parse
+DIAGNOSTICS_WAIT = 0.25
+# Candidates are ranked and cut to this many before they are converted
+DEFAULT_MAX_CANDIDATES = 100
+# The parsed resources are kept here between runs
+DEFAULT_CACHE_DIR = os.path.join( os.environ.get( 'XDG_CACHE_HOME' ) or
+                                  os.path.join( os.path.expanduser( '~' ), '.cache' ),
+                                  'robotframework-ycm' )
 
 _logger = logging.getLogger( __name__ )
 
@@ -26,13 +62,82 @@ class RobotFrameworkCompleter( Completer ):
     subcommands = {
         'StartServer': ( lambda self, request_data: self._StartServer() ),
         'StopServer': ( lambda self, request_data: self._StopServer() ),
+        'ResourceGraph': ( lambda self, request_data: self._ResourceGraph() ),
+        'Stats': ( lambda self, request_data: self._Stats() ),
+        'GoToDefinition': ( lambda self, request_data: self._GoToDefinition( request_data ) ),
+        'GoToReferences': ( lambda self, request_data: self._GoToReferences( request_data ) ),
+        'GetDoc': ( lambda self, request_data: self._GetDoc( request_data ) ),
     }
 
 
     def __init__( self, user_options ):
         super( RobotFrameworkCompleter, self ).__init__( user_options )
         self._popener = utils.SafePopen # Overridden in test.
-        self._parser = None
+
+        # Loading resource trees in parallel is opt-in
+        self._resource_threads = user_options.get( 'robotframework_resource_threads', 0 )
+        self._resource_processes = user_options.get( 'robotframework_resource_processes', 0 )
+
+        # Resolve Resource settings from an index of this directory tree
+        self._workspace_root = user_options.get( 'robotframework_workspace_root' )
+
+        # Most candidates returned per completion request, 0 for all of them
+        self._max_candidates = user_options.get( 'robotframework_max_candidates',
+                                                 DEFAULT_MAX_CANDIDATES )
+
+        # Keywords of libraries described by libdoc spec files
+        self._library_catalog = user_options.get( 'robotframework_library_catalog' )
+        self._libdoc_dirs = user_options.get( 'robotframework_libdoc_dirs', [] )
+
+        # Parsed buffers kept, switching back to one of them does not parse
+        # its resources again
+        self._max_parsers = user_options.get( 'robotframework_max_open_files',
+                                              DEFAULT_MAX_PARSERS )
+
+        # Refresh the parsed resources when their files change on disk
+        self._watch_resources = user_options.get( 'robotframework_watch_resources', 0 )
+
+        # Report unresolved keyword calls and unknown variables
+        self._diagnostics = user_options.get( 'robotframework_diagnostics', 1 )
+
+        # Index of the parsed resources loaded at startup and the library
+        # catalog, an empty directory keeps them in memory
+        cache_dir = user_options.get( 'robotframework_cache_dir', DEFAULT_CACHE_DIR )
+        self._index_path = ( index_path( cache_dir, self._workspace_root )
+                             if cache_dir else None )
+        if not self._library_catalog and cache_dir:
+            self._library_catalog = catalog_path( cache_dir )
+
+        # Parses in process while the RF parser server is not running. The
+        # process pool is left to the server, ycmd itself only uses threads.
+        configure_resource_loading( self._resource_threads )
+        resource_resolver.set_workspace_root( self._workspace_root )
+        configure_library_catalog( self._library_catalog, self._libdoc_dirs )
+        self._worker = ParseWorker( self._index_path, bool( self._watch_resources ),
+                                    self._max_parsers )
+
+        self._server = None
+        self._server_logfile = None
+        # Set by StopServer, parses do not start the server again until StartServer
+        self._server_stopped = False
+        # Exits of the server in a row and when it may be started again
+        self._server_started = 0
+        self._server_exits = 0
+        self._server_restart_at = 0
+        self._server_write_lock = threading.Lock()
+        self._server_request_ids = itertools.count( 1 )
+        self._server_responses = {}
+        self._parse_requests = 0
+
+        # filepath -> ( contents key, LineTable ) of the last buffers seen,
+        # as many as parsers are kept
+        self._line_tables = collections.OrderedDict()
+        self._line_tables_lock = threading.Lock()
+
+        # Last ( request key, candidates ) pair and its hit counters
+        self._candidates_memo = None
+        self.candidates_memo_hits = 0
+        self.candidates_memo_misses = 0
 
         _logger.info( 'Enabling robot framework completion' )
 
@@ -41,53 +146,110 @@ class RobotFrameworkCompleter( Completer ):
         return ROBOTFW_FILETYPES
 
     def ShouldUseNowInner( self, request_data ):
-        filename = request_data[ 'filepath' ]
-        contents = utils.ToUtf8IfNeeded(request_data[ 'file_data' ][ filename ][ 'contents' ])
-        lines = contents.splitlines()
+        try:
+            resultdata = self._Candidates( request_data )
 
-        line_num = request_data['line_num'] - 1
+            if resultdata and len(resultdata) == 2 and len(resultdata[1]) > 0:
+                return True
 
-        if line_num < len(lines):
-            line = lines[line_num]
+        except ValueError:
+            pass
 
-            try:
-                column_num = request_data['column_num'] - 1
-                resultdata = self._parser.candidates(line, line_num, column_num)
+        return False
 
-                if len(resultdata) == 2 and len(resultdata[1]) > 0:
-                    return True
 
-            except ValueError:
-                pass
+    def ComputeCandidatesInner( self, request_data ):
+        try:
+            resultdata = self._Candidates( request_data )
 
-        return False
+            if resultdata is None:
+                return []
 
+            if len(resultdata) != 2:
+                _logger.error( NO_COMPLETIONS_MESSAGE )
+                raise RuntimeError( NO_COMPLETIONS_MESSAGE )
 
-    def ComputeCandidatesInner( self, request_data ):
+            return [ _ConvertCompletionData( x ) for x in resultdata[1] ]
+
+        except ValueError:
+            _logger.error( PARSE_ERROR_MESSAGE )
+            raise RuntimeError( PARSE_ERROR_MESSAGE )
+
+
+    def _Candidates( self, request_data ):
+        """ Parser candidates at the request's cursor, None past the end of the
+        file. ycmd asks ShouldUseNowInner and ComputeCandidatesInner about the
+        same cursor back to back, so the last result is memoized. """
         filename = request_data[ 'filepath' ]
-        contents = utils.ToUtf8IfNeeded(request_data[ 'file_data' ][ filename ][ 'contents' ])
-        lines = contents.splitlines()
+        table = self._LineTable( request_data )
+        line_num = request_data[ 'line_num' ] - 1
+        column_num = _CursorColumn( request_data, table )
 
-        line_num = request_data['line_num'] - 1
+        # The table is the same object as long as the buffer is unchanged
+        key = ( filename, table, line_num, column_num, self._ParserRevision() )
 
-        if line_num < len(lines):
-            line = lines[line_num]
+        if self._candidates_memo and self._candidates_memo[ 0 ] == key:
+            self.candidates_memo_hits += 1
+            return self._candidates_memo[ 1 ]
 
+        self.candidates_memo_misses += 1
+
+        line = table.line( line_num )
+        if line is None:
+            resultdata = None
+        else:
+            resultdata = self._ParserCandidates( filename, line, line_num, column_num )
+
+        self._candidates_memo = ( key, resultdata )
+        return resultdata
+
+
+    def _LineTable( self, request_data ):
+        """ LineTable of the request's buffer, built once per revision of the
+        buffer and shared by every handler """
+        filename = request_data[ 'filepath' ]
+        contents = request_data[ 'file_data' ][ filename ][ 'contents' ]
+        key = ( len( contents ), hash( contents ) )
+
+        with self._line_tables_lock:
+            cached = self._line_tables.pop( filename, None )
+            if cached is None or cached[ 0 ] != key:
+                cached = ( key, LineTable( utils.ToUtf8IfNeeded( contents ) ) )
+
+            self._line_tables[ filename ] = cached
+            while len( self._line_tables ) > max( self._max_parsers, 1 ):
+                self._line_tables.popitem( last = False )
+
+            return cached[ 1 ]
+
+
+    def _ParserCandidates( self, filename, line, line_num, column_num ):
+        if self._ServerIsRunning():
             try:
-                column_num = request_data['column_num'] - 1
-                resultdata = self._parser.candidates(line, line_num, column_num)
+                extra, rows = self._ServerRequest( 'candidates',
+                                                   timeout = SERVER_TIMEOUT,
+                                                   filepath = filename,
+                                                   line = line,
+                                                   line_num = line_num,
+                                                   column = column_num,
+                                                   limit = self._max_candidates or None )
+                return [ extra, [ Symbol.from_row( row ) for row in rows ] ]
+            except RuntimeError as e:
+                _logger.error( 'RF parser server query failed: {0}'.format( e ) )
 
-                if len(resultdata) != 2:
-                    _logger.error( NO_COMPLETIONS_MESSAGE )
-                    raise RuntimeError( NO_COMPLETIONS_MESSAGE )
+        parser = self._worker.parser( filename )
+        if parser is None:
+            return None
 
-                return [ _ConvertCompletionData( x ) for x in resultdata[1] ]
+        return parser.candidates( line, line_num, column_num,
+                                  self._max_candidates or None )
 
-            except ValueError:
-                _logger.error( PARSE_ERROR_MESSAGE )
-                raise RuntimeError( PARSE_ERROR_MESSAGE )
 
-        return []
+    def _ParserRevision( self ):
+        if self._ServerIsRunning():
+            return ( 'server', self._parse_requests )
+
+        return ( 'worker', self._worker.completed, self._worker.refreshed )
 
 
     def DefinedSubcommands( self ):
@@ -95,13 +257,39 @@ class RobotFrameworkCompleter( Completer ):
 
 
     def OnFileReadyToParse( self, request_data ):
-        _logger.info( "file ready {0}".format(str(request_data)))
-
         filename = request_data[ 'filepath' ]
-        contents = utils.ToUtf8IfNeeded(request_data[ 'file_data' ][ filename ][ 'contents' ])
+        contents = self._LineTable( request_data ).contents
+
+        _logger.debug( 'File ready {0} ({1} bytes)'.format( filename, len( contents ) ) )
 
-        self._parser = RobotFrameworkParser(filename, contents)
-        self._StartServer()
+        self._RestartServer()
+
+        if self._ServerIsRunning():
+            try:
+                if not self._diagnostics:
+                    self._ServerRequest( 'parse', filepath = filename, contents = contents )
+                    self._parse_requests += 1
+                    return
+
+                rows = self._ServerRequest( 'parse',
+                                            timeout = DIAGNOSTICS_WAIT + SERVER_TIMEOUT,
+                                            filepath = filename,
+                                            contents = contents,
+                                            wait = DIAGNOSTICS_WAIT )
+                self._parse_requests += 1
+                return _BuildDiagnostics( filename, rows )
+            except RuntimeError as e:
+                _logger.error( 'Parsing in the RF parser server failed: {0}'.format( e ) )
+
+        # The diagnostics of the last finished parse, waiting for this one
+        # would hold up the ycmd thread
+        self._worker.submit( filename, contents )
+        if not self._diagnostics:
+            return
+
+        parser = self._worker.parser( filename )
+        if parser is not None:
+            return _BuildDiagnostics( filename, parser.diagnostics() )
 
 
     def OnUserCommand( self, arguments, request_data ):
@@ -118,45 +306,325 @@ class RobotFrameworkCompleter( Completer ):
 
     def Shutdown( self ):
         self._StopServer()
+        self._worker.stop()
 
 
     def _StartServer( self ):
-        """ Start the RF server if we have one """
-        pass
+        """ Start the RF parser server unless it is already running, also
+        after StopServer or after it kept exiting """
+        self._server_stopped = False
+        self._server_exits = 0
+        self._server_restart_at = 0
+
+        if not self._ServerIsRunning():
+            self._LaunchServer()
+
+
+    def _RestartServer( self ):
+        """ Start the RF parser server for a parse unless it was stopped with
+        StopServer, or exited on its own less than its backoff ago """
+        if self._server_stopped or self._ServerIsRunning():
+            return
+
+        if self._server is not None:
+            log = self._ServerLog()
+            if log:
+                _logger.error( 'RF parser server log:\n{0}'.format( log ) )
+
+            self._BackOff( 'RF parser server exited with {0}'.format( self._server.returncode ) )
+            self._server = None
+            self._CloseServerLog()
+
+        if time.time() >= self._server_restart_at:
+            self._LaunchServer()
+
+
+    def _LaunchServer( self ):
+        _logger.info( 'Starting RF parser server' )
+
+        self._CloseServerLog()
+        self._server_started = time.time()
+
+        try:
+            self._server_logfile = tempfile.NamedTemporaryFile(
+                prefix = 'robotfw_server_', suffix = '.log', delete = False )
+
+            command = [ sys.executable, SERVER_SCRIPT,
+                        '--resource-threads', str( self._resource_threads ),
+                        '--resource-processes', str( self._resource_processes ),
+                        '--max-parsers', str( self._max_parsers ) ]
+            if self._workspace_root:
+                command.extend( [ '--workspace-root', self._workspace_root ] )
+            if self._library_catalog:
+                command.extend( [ '--library-catalog', self._library_catalog ] )
+            for libdoc_dir in self._libdoc_dirs:
+                command.extend( [ '--libdoc-dir', libdoc_dir ] )
+            if self._index_path:
+                command.extend( [ '--index-file', self._index_path ] )
+            if self._watch_resources:
+                command.append( '--watch-resources' )
+
+            self._server = self._popener( command,
+                                          stdin = subprocess.PIPE,
+                                          stdout = subprocess.PIPE,
+                                          stderr = self._server_logfile )
+        except Exception as e:
+            self._BackOff( 'Could not start the RF parser server: {0}'.format( e ) )
+            self._server = None
+            self._CloseServerLog()
+            return
+
+        reader = threading.Thread( target = self._ReadServerResponses,
+                                   args = ( self._server, ) )
+        reader.daemon = True
+        reader.start()
+
+
+    def _BackOff( self, reason ):
+        """ Delay the next start of the server, twice as long as the last
+        time if it did not run for longer than that """
+        now = time.time()
+        if now - self._server_started < SERVER_MAX_BACKOFF:
+            self._server_exits += 1
+        else:
+            self._server_exits = 1
+
+        delay = min( SERVER_BACKOFF * 2 ** ( self._server_exits - 1 ), SERVER_MAX_BACKOFF )
+        self._server_restart_at = now + delay
+
+        _logger.error( '{0}, parsing in ycmd for the next {1}s'.format( reason, delay ) )
 
 
     def _StopServer( self ):
-        """ Stop the RF server if we have one """
-        pass
+        """ Stop the RF parser server if it is running, parses do not start it
+        again until StartServer """
+        self._server_stopped = True
+
+        if self._ServerIsRunning():
+            _logger.info( 'Stopping RF parser server' )
+            server = self._server
+
+            try:
+                self._ServerRequest( 'shutdown', timeout = SERVER_TIMEOUT )
+            except RuntimeError:
+                pass
 
+            if server.poll() is None:
+                server.terminate()
+            server.wait()
 
-# Compute the byte offset in the file given the line and column.
-# Code borrowed from the gocode completer
-def _ComputeOffset( contents, line, col ):
-    curline = 1
-    curcol = 1
+        self._server = None
+        self._CloseServerLog()
 
-    for i, byte in enumerate( contents ):
-        if curline == line and curcol == col:
-            return i
-        curcol += 1
-        if byte == '\n':
-            curline += 1
-            curcol = 1
 
-    _logger.error( 'RobotFrameworkCompleter - could not compute byte offset ' +
-                   'corresponding to L%i C%i', line, col )
-    return -1
+    def _ServerLog( self ):
+        """ Last lines the server wrote to its log """
+        try:
+            with open( self._server_logfile.name ) as log:
+                return ''.join( log.readlines()[ -SERVER_LOG_LINES: ] ).rstrip()
+        except ( IOError, OSError ):
+            return ''
 
 
-def _ConvertCompletionData( completion_data ):
+    def _CloseServerLog( self ):
+        if self._server_logfile is None:
+            return
+
+        self._server_logfile.close()
+        try:
+            os.remove( self._server_logfile.name )
+        except OSError as e:
+            _logger.warning( 'Could not remove the RF parser server log: {0}'.format( e ) )
+
+        self._server_logfile = None
+
+
+    def _ResourceGraph( self ):
+        """ Describe the resource graph: node and edge count, depth and import
+        cycles of the last resource tree walked """
+        if self._ServerIsRunning():
+            description = self._ServerRequest( 'graph', timeout = SERVER_TIMEOUT )
+        else:
+            description = resource_graph.describe()
+
+        return responses.BuildDisplayMessageResponse(
+            json.dumps( description, sort_keys = True ) )
+
+
+    def _Stats( self ):
+        """ Report the phase timers and counters of the parsing done in ycmd
+        and, while it is running, in the RF parser server """
+        completer = self._worker.statistics()
+        completer[ 'counters' ].update( {
+            'candidates_memo_hits': self.candidates_memo_hits,
+            'candidates_memo_misses': self.candidates_memo_misses,
+        } )
+
+        report = { 'completer': completer }
+        if self._ServerIsRunning():
+            try:
+                report[ 'server' ] = self._ServerRequest( 'stats', timeout = SERVER_TIMEOUT )
+            except RuntimeError as e:
+                report[ 'server' ] = { 'error': str( e ) }
+
+        return responses.BuildDisplayMessageResponse(
+            json.dumps( report, sort_keys = True ) )
+
+
+    def _ServerIsRunning( self ):
+        return self._server is not None and self._server.poll() is None
+
+
+    def _GoToDefinition( self, request_data ):
+        location = self._Navigate( 'definition', request_data )
+        if location is None:
+            raise RuntimeError( 'Can not jump to the definition.' )
+
+        path, line, column = location
+        return responses.BuildGoToResponse( path, line + 1, column + 1 )
+
+
+    def _GoToReferences( self, request_data ):
+        references = self._Navigate( 'references', request_data )
+        if not references:
+            raise RuntimeError( 'No references found.' )
+
+        return [ responses.BuildGoToResponse( path, line + 1, column + 1 )
+                 for path, line, column in references ]
+
+
+    def _GetDoc( self, request_data ):
+        documentation = self._Navigate( 'doc', request_data )
+        if documentation is None:
+            raise RuntimeError( 'No documentation available.' )
+
+        return responses.BuildDetailedInfoResponse( documentation )
+
+
+    def _Navigate( self, command, request_data ):
+        """ Answer a definition, references or doc query about the request's
+        cursor from the last finished parse of the buffer """
+        filename = request_data[ 'filepath' ]
+        line_num = request_data[ 'line_num' ] - 1
+        column = _CursorColumn( request_data, self._LineTable( request_data ) )
+
+        if self._ServerIsRunning():
+            try:
+                return self._ServerRequest( command,
+                                            timeout = SERVER_TIMEOUT,
+                                            filepath = filename,
+                                            line_num = line_num,
+                                            column = column )
+            except RuntimeError as e:
+                _logger.error( 'RF parser server query failed: {0}'.format( e ) )
+
+        parser = self._worker.parser( filename )
+        if parser is None:
+            return None
+
+        if command == 'definition':
+            return parser.definition( line_num, column )
+        elif command == 'references':
+            return parser.references( line_num, column )
+
+        return parser.documentation( line_num, column )
+
+
+    def _ServerRequest( self, command, timeout = None, **kwargs ):
+        """ Send a request to the RF parser server. Waits up to timeout seconds
+        for the reply and returns its result; without a timeout no reply is
+        expected and None is returned. """
+        if not self._ServerIsRunning():
+            raise RuntimeError( SERVER_NOT_RUNNING_MESSAGE )
+
+        request_id = next( self._server_request_ids )
+        request = dict( kwargs, id = request_id, command = command )
+
+        pending = None
+        if timeout is not None:
+            pending = _PendingResponse()
+            self._server_responses[ request_id ] = pending
+
+        try:
+            with self._server_write_lock:
+                self._server.stdin.write( json.dumps( request ) + '\n' )
+                self._server.stdin.flush()
+
+            if pending is None:
+                return None
+
+            if not pending.event.wait( timeout ):
+                raise RuntimeError( SERVER_TIMEOUT_MESSAGE )
+        except ( IOError, OSError, ValueError ) as e:
+            raise RuntimeError( str( e ) )
+        finally:
+            self._server_responses.pop( request_id, None )
+
+        if 'error' in pending.response:
+            raise RuntimeError( pending.response[ 'error' ] )
+
+        return pending.response.get( 'result' )
+
+
+    def _ReadServerResponses( self, server ):
+        for line in iter( server.stdout.readline, b'' ):
+            try:
+                response = json.loads( line )
+            except ValueError:
+                _logger.error( 'Malformed RF parser server response {0!r}'.format( line ) )
+                continue
+
+            pending = self._server_responses.get( response.get( 'id' ) )
+            if pending:
+                pending.response = response
+                pending.event.set()
+
+        # The server exited, nothing will answer the requests still waiting
+        for pending in list( self._server_responses.values() ):
+            pending.response = { 'error': SERVER_NOT_RUNNING_MESSAGE }
+            pending.event.set()
+
+
+class _PendingResponse( object ):
+
+    def __init__( self ):
+        self.event = threading.Event()
+        self.response = None
+
+
+def _CursorColumn( request_data, table ):
+    """ 0-based byte column of the request's cursor, which the parser indexes
+    its UTF-8 encoded lines with. ycmd versions that only send the column in
+    characters have it converted. """
+    if 'column_num' in request_data:
+        return request_data[ 'column_num' ] - 1
+
+    return table.byte_column( request_data[ 'line_num' ] - 1,
+                              request_data[ 'column_codepoint' ] - 1 )
+
+
+def _ConvertCompletionData( symbol ):
     return responses.BuildCompletionData(
-        insertion_text = completion_data[ 'name' ],
-        menu_text = completion_data[ 'name' ],
-        extra_menu_info = completion_data[ 'type' ],
-        kind = completion_data[ 'class' ],
-        detailed_info = ' '.join( [
-            completion_data[ 'name' ],
-            completion_data[ 'type' ],
-            completion_data[ 'class' ] ] ) )
+        insertion_text = symbol.name,
+        menu_text = symbol.name,
+        extra_menu_info = symbol.type,
+        kind = symbol.label,
+        detailed_info = ' '.join( [ symbol.name, symbol.type, symbol.label ] ) )
+
+
+
+def _BuildDiagnostics( filename, rows ):
+    """ ycmd diagnostics of ( line, column, length, kind, message ) rows,
+    which count lines and byte columns from 0 """
+    if rows is None:
+        return None
+
+    diagnostics = []
+    for line, column, length, kind, message in rows:
+        start = responses.Location( line + 1, column + 1, filename )
+        end = responses.Location( line + 1, column + length + 1, filename )
+        diagnostic = responses.Diagnostic( [], start, responses.Range( start, end ),
+                                           message, kind )
+        diagnostics.append( responses.BuildDiagnosticData( diagnostic ) )
 
+    return diagnostics
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+
+import os
+import re
+
+
+# Severities, named as ycmd names diagnostic kinds
+ERROR = 'ERROR'
+WARNING = 'WARNING'
+
+# Variables Robot Framework defines for every suite, normalized
+builtin_variables = frozenset([
+    '/', ':', '\\n', 'space', 'true', 'false', 'none', 'null', 'empty', 'curdir', 'tempdir', 'execdir',
+    'testname', 'testtags', 'testdocumentation', 'teststatus', 'testmessage',
+    'prevtestname', 'prevteststatus', 'prevtestmessage',
+    'suitename', 'suitesource', 'suitedocumentation', 'suitemetadata', 'suitestatus', 'suitemessage',
+    'keywordstatus', 'keywordmessage', 'loglevel', 'outputdir', 'outputfile', 'logfile', 'reportfile',
+    'debugfile', 'options',
+])
+
+# A variable in a cell, unless it is escaped. Nested variables match innermost.
+_VARIABLE = re.compile(r'(?<!\\)[$@&%]\{([^{}]*)\}')
+
+# A cell assigning the return value of a keyword: ${x}, ${x}= or ${x} =
+_ASSIGNMENT = re.compile(r'^[$@&]\{[^{}]+\}\s*=?$')
+
+# Numbers are variables too: ${1}, ${0.5}, ${0x1F}, ${1e3}
+_NUMBER = re.compile(r'^[-+]?(0[xob][0-9a-f]+|[0-9][0-9_]*(\.[0-9_]*)?(e[-+]?[0-9]+)?)$', re.IGNORECASE)
+
+# Where the base name of extended variable syntax ends: ${obj.attr}, ${x + 1}, ${x}[0]
+_EXTENDED = re.compile(r'[.\[\](){}+\-*/%<>=!,\'"]')
+
+# Gherkin style prefixes Robot Framework ignores in keyword calls
+_BDD_PREFIX = re.compile(r'^(given|when|then|and|but)\s+', re.IGNORECASE)
+
+_EMBEDDED_ARGUMENT = re.compile(r'\$\{[^}]*\}')
+
+
+def normalize_name(name):
+    """ Keyword and variable names match ignoring case, spaces and underscores """
+    return name.lower().replace(' ', '').replace('_', '')
+
+
+def normalize_variable(variable):
+    """ Normalized bare name of a variable, its type sigil does not matter """
+    if len(variable) > 2 and variable[0] in '$@&%' and variable[1] == '{' and variable[-1] == '}':
+        variable = variable[2:-1]
+
+    return normalize_name(variable)
+
+
+def extended_base(variable):
+    """ Normalized base name of a variable using extended variable syntax,
+    e.g. obj of ${obj.attr}, None for a plain variable """
+    name = variable[2:-1]
+    base = _EXTENDED.split(name, 1)[0]
+
+    return normalize_name(base) if base != name else None
+
+
+def variables_in(text):
+    """ The variables used in a cell, decorated, in order """
+    if '{' not in text:
+        return []
+
+    return [match.group(0) for match in _VARIABLE.finditer(text)]
+
+
+def variable_spans(text):
+    """ (start, end, variable) of the variables used in a cell """
+    if '{' not in text:
+        return []
+
+    return [(match.start(), match.end(), match.group(0)) for match in _VARIABLE.finditer(text)]
+
+
+def strip_bdd_prefix(call):
+    """ A keyword call without its Given/When/Then/And/But prefix """
+    return _BDD_PREFIX.sub('', call, 1)
+
+
+def embedded_pattern(name):
+    """ Regular expression matching the calls of a keyword with embedded arguments """
+    parts = _EMBEDDED_ARGUMENT.split(name)
+    return re.compile('^' + '.+?'.join(re.escape(part) for part in parts) + '$', re.IGNORECASE)
+
+
+def is_assignment(cell):
+    return _ASSIGNMENT.match(cell) is not None
+
+
+def assigned_variable(cell):
+    """ The variable an assignment cell assigns, without the equals sign """
+    return cell.rstrip('= ')
+
+
+class KeywordIndex():
+    """ Answers whether a keyword call resolves, with hash lookups.
+
+    Holds the normalized names of the user keywords a file can call and
+    shares the normalized names of its libraries. Calls may be qualified by
+    a library, a library alias or the name of a resource file, and may use
+    the Given/When/Then/And/But prefixes. Keywords with embedded arguments
+    are matched as regular expressions, after the lookups failed.
+    """
+
+    def __init__(self, user_keywords, libraries, aliases, resources):
+        """ libraries maps library names and aliases, to the normalized names
+        of their keywords. resources maps resource file paths to the names of
+        the keywords they define. """
+        self._names = set()
+        self._embedded = []
+
+        for name in user_keywords:
+            if '${' in name:
+                self._embedded.append(embedded_pattern(name))
+            else:
+                self._names.add(normalize_name(name))
+
+        self._libraries = list(libraries.values())
+
+        self._qualified = dict((normalize_name(library), names) for library, names in libraries.items())
+        for alias, library in aliases.items():
+            names = libraries.get(library)
+            if names is not None:
+                self._qualified[normalize_name(alias)] = names
+
+        # Normalized resource name -> its keywords, normalized on first use
+        self._resources = dict((normalize_name(os.path.splitext(os.path.basename(path))[0]), keywords)
+                               for path, keywords in resources.items())
+
+
+    def resolves(self, call):
+        stripped = strip_bdd_prefix(call)
+
+        for name in (call, stripped) if stripped != call else (call,):
+            key = normalize_name(name)
+            if key in self._names or any(key in names for names in self._libraries):
+                return True
+
+            if self._resolves_qualified(name):
+                return True
+
+            for pattern in self._embedded:
+                if pattern.match(name):
+                    return True
+
+        return False
+
+
+    def _resolves_qualified(self, name):
+        # The qualifier can contain dots itself, try every split
+        dot = name.find('.')
+        while dot > 0:
+            qualifier = normalize_name(name[:dot])
+            names = self._qualified.get(qualifier)
+
+            if names is None and qualifier in self._resources:
+                names = self._qualified[qualifier] = frozenset(normalize_name(keyword)
+                                                               for keyword in self._resources[qualifier])
+
+            if names is not None and normalize_name(name[dot + 1:]) in names:
+                return True
+
+            dot = name.find('.', dot + 1)
+
+        return False
+
+
+class VariableIndex():
+    """ Answers whether a variable is defined, with hash lookups """
+
+    def __init__(self, variables):
+        self._names = set(normalize_variable(variable) for variable in variables)
+        self._names.update(builtin_variables)
+
+
+    def defines(self, variable, local_names=()):
+        """ Whether variable, as used in a cell, is defined globally or in local_names """
+        if variable[0] == '%':
+            # Environment variable
+            return True
+
+        name = variable[2:-1]
+        if not name or _NUMBER.match(name):
+            return True
+
+        key = normalize_name(name)
+        if key in self._names or key in local_names:
+            return True
+
+        key = extended_base(variable)
+        if key is not None:
+            return not key or key in self._names or key in local_names
+
+        return False
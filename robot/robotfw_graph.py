@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+import logging
+import threading
+
+
+_logger = logging.getLogger(__name__)
+
+
+class ResourceGraph():
+    """ Graph of the resource files seen in this session.
+
+    Nodes are resource files by resolved path, edges their Resource settings.
+    The parsed files themselves live in the resource cache, so every file is
+    parsed once and shared by all the suites that import it.
+    """
+
+    def __init__(self):
+        # path -> resolved paths of the resources it imports
+        self._edges = {}
+        self._lock = threading.Lock()
+
+        self.last_walk = {}
+
+
+    def walk(self, roots, load):
+        """ Return the nodes reachable from roots in depth first import order.
+
+        load(path) returns the parsed resource at path or None. Every file is
+        visited once even if it is imported along several paths; imports that
+        lead back to a file being visited are recorded as cycles.
+        """
+        order = []
+        visited = set()
+        ancestors = []
+        cycles = []
+        stats = {'depth': 0}
+
+        def visit(path, depth):
+            if path in ancestors:
+                cycles.append(tuple(ancestors[ancestors.index(path):]) + (path,))
+                return
+
+            if path in visited:
+                return
+
+            visited.add(path)
+
+            node = load(path)
+            if node is None:
+                with self._lock:
+                    self._edges.pop(path, None)
+                return
+
+            with self._lock:
+                self._edges[path] = tuple(node.resource_paths)
+
+            order.append(node)
+            stats['depth'] = max(stats['depth'], depth)
+
+            ancestors.append(path)
+            for child in node.resource_paths:
+                visit(child, depth + 1)
+            ancestors.pop()
+
+        for root in roots:
+            visit(root, 1)
+
+        for cycle in cycles:
+            _logger.info('Resource import cycle: {0}'.format(' -> '.join(cycle)))
+
+        self.last_walk = {
+            'roots' : list(roots),
+            'nodes' : len(order),
+            'depth' : stats['depth'],
+            'cycles' : [list(cycle) for cycle in cycles],
+        }
+
+        return order
+
+
+    def describe(self):
+        """ Summary of the graph for debugging """
+        with self._lock:
+            node_count = len(self._edges)
+            edge_count = sum(len(children) for children in self._edges.values())
+
+        return {
+            'nodes' : node_count,
+            'edges' : edge_count,
+            'last_walk' : self.last_walk,
+        }
+
+
+class SymbolUnion():
+    """ Read only union of several symbol collections.
+
+    Used instead of copying the symbols of every imported resource into the
+    importing suite. Members are referenced, not copied, and may be any
+    container supporting 'in' and iteration (sets, Counters, other unions).
+    """
+
+    def __init__(self, members):
+        self._members = []
+
+        for member in members:
+            if isinstance(member, SymbolUnion):
+                self._members.extend(member._members)
+            else:
+                self._members.append(member)
+
+
+    def __contains__(self, item):
+        for member in self._members:
+            if item in member:
+                return True
+
+        return False
+
+
+    def __iter__(self):
+        seen = set()
+        for member in self._members:
+            for item in member:
+                if item not in seen:
+                    seen.add(item)
+                    yield item
+
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+    def __nonzero__(self):
+        return any(self._members)
+
+    __bool__ = __nonzero__
+
+
+resource_graph = ResourceGraph()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+import bisect
+import heapq
+import itertools
+import re
+
+
+class CandidateIndex():
+    """ Immutable, sorted collection of completion candidates.
+
+    Candidates are sorted on a lower case key so that all candidates starting
+    with a given prefix form a contiguous run which is found by bisection.
+    The candidates are shared between lookups and must not be modified.
+    """
+
+    def __init__(self, candidates, key=None):
+        key = key or _name_key
+        entries = sorted(((key(c), c) for c in candidates), key=_entry_key)
+
+        self._keys = [k for k, _ in entries]
+        self._candidates = tuple(c for _, c in entries)
+
+        # All keys on one line each, and where every line starts, built
+        # for the first subsequence search
+        self._joined = None
+        self._line_starts = None
+
+
+    def __len__(self):
+        return len(self._candidates)
+
+
+    def __iter__(self):
+        return iter(self._candidates)
+
+
+    def _range(self, prefix):
+        """ Positions of the candidates whose key starts with prefix """
+        if not prefix:
+            return 0, len(self._candidates)
+
+        prefix = prefix.lower()
+        keys = self._keys
+
+        start = bisect.bisect_left(keys, prefix)
+        end = start
+        while end < len(keys) and keys[end].startswith(prefix):
+            end += 1
+
+        return start, end
+
+
+    def _search(self, pattern):
+        """ Positions of the keys pattern matches, in one search over all keys """
+        if self._joined is None:
+            starts = []
+            offset = 0
+            for key in self._keys:
+                starts.append(offset)
+                offset += len(key) + 1
+
+            self._line_starts = starts
+            self._joined = '\n'.join(self._keys)
+
+        positions = []
+        last = -1
+        for match in pattern.finditer(self._joined):
+            position = bisect.bisect_right(self._line_starts, match.start()) - 1
+            if position != last:
+                positions.append(position)
+                last = position
+
+        return positions
+
+
+def lookup_all(indexes, prefix, limit=None):
+    """ Candidates of several indexes whose key starts with prefix, in key order.
+
+    Merges the matching runs of the indexes instead of building an index of
+    their union, so shared indexes can be combined per query without copying.
+    With a limit only the first limit candidates are returned.
+    """
+    runs = []
+    for number, index in enumerate(indexes):
+        start, end = index._range(prefix)
+        if limit:
+            end = min(end, start + limit)
+        if start < end:
+            runs.append([(index._keys[i], number, i, index._candidates[i]) for i in range(start, end)])
+
+    if len(runs) == 1:
+        return [candidate for _, _, _, candidate in runs[0]]
+
+    merged = heapq.merge(*runs)
+    if limit:
+        merged = itertools.islice(merged, limit)
+
+    return [candidate for _, _, _, candidate in merged]
+
+
+def fuzzy_lookup(indexes, query, limit=None):
+    """ Candidates of several indexes matching query, best first, at most limit.
+
+    Candidates whose key starts with query come first, in key order. If there
+    are fewer than limit of them, candidates containing the characters of
+    query in order follow, ranked by how many of those characters neither
+    start a word nor follow the previous match ('sbe' ranks Should Be Equal
+    high), then by where the match starts.
+    """
+    query = query.lower()
+    matches = lookup_all(indexes, query, limit)
+
+    if not query or (limit and len(matches) >= limit):
+        return matches[:limit] if limit else matches
+
+    pattern = _subsequence_pattern(query)
+
+    scored = []
+    for index in indexes:
+        for position in index._search(pattern):
+            key = index._keys[position]
+            if not key.startswith(query):
+                scored.append((_subsequence_score(key, query), key, index._candidates[position]))
+
+    scored.sort(key=lambda entry: entry[:2])
+    matches.extend(candidate for _, _, candidate in scored)
+
+    return matches[:limit] if limit else matches
+
+
+def _subsequence_pattern(query):
+    """ Regular expression matching the lines containing the characters of query in order.
+
+    Each character is found by skipping everything else up to its first
+    occurrence, so a line is scanned once and never backtracked into.
+    """
+    parts = ['(?m)^']
+    for char in query:
+        if char == '\n':
+            continue
+
+        escaped = re.escape(char)
+        parts.append('[^{0}\n]*{0}'.format(escaped))
+
+    return re.compile(''.join(parts))
+
+
+def _subsequence_score(key, query):
+    """ Lower is better: scattered query characters, the first match, the key's length """
+    position = -1
+    first = None
+    scattered = 0
+
+    for char in query:
+        previous = position
+        position = key.find(char, position + 1)
+        if position > 0 and position != previous + 1 and key[position - 1].isalnum():
+            scattered += 1
+        if first is None:
+            first = position
+
+    return (scattered, first, len(key))
+
+
+def _entry_key(entry):
+    return entry[0]
+
+
+def _name_key(candidate):
+    return candidate.name.lower()
+
+
+def variable_key(candidate):
+    """ Key variables on their bare name, so ${HOST} is found by both ${ho and ho """
+    return strip_variable_decoration(candidate.name.lower())
+
+
+def strip_variable_decoration(text):
+    if len(text) > 1 and text[0] in '$@&%' and text[1] == '{':
+        text = text[2:]
+
+    return text.rstrip('}')
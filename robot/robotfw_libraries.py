@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import logging
+import os
+import threading
+
+
+_logger = logging.getLogger(__name__)
+
+
+# One <library name>.txt per built in library, one keyword per line
+LIBRARIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'libraries')
+
+
+class LibraryKeywords():
+    """ Keywords of the libraries shipped with the completer.
+
+    Behaves like a read only dict of library name -> keyword names. The
+    names are known up front from the files in the libraries directory,
+    but the keywords of a library are only read once a suite imports it.
+    """
+
+    def __init__(self, directory=LIBRARIES_DIR):
+        self._directory = directory
+        self._keywords = {}
+        self._lock = threading.Lock()
+
+        try:
+            filenames = os.listdir(directory)
+        except OSError as e:
+            _logger.error('Could not list libraries in {0}: {1}'.format(directory, e))
+            filenames = []
+
+        self._names = frozenset(os.path.splitext(filename)[0] for filename in filenames
+                                if filename.endswith('.txt'))
+
+
+    def __contains__(self, library_name):
+        return library_name in self._names
+
+
+    def __iter__(self):
+        return iter(sorted(self._names))
+
+
+    def __len__(self):
+        return len(self._names)
+
+
+    def __getitem__(self, library_name):
+        keywords = self.get(library_name)
+        if keywords is None:
+            raise KeyError(library_name)
+
+        return keywords
+
+
+    def get(self, library_name, default=None):
+        if library_name not in self._names:
+            return default
+
+        with self._lock:
+            if library_name not in self._keywords:
+                self._keywords[library_name] = self._load(library_name)
+
+            return self._keywords[library_name]
+
+
+    def loaded(self):
+        """ Names of the libraries whose keywords have been read so far """
+        with self._lock:
+            return sorted(self._keywords)
+
+
+    def _load(self, library_name):
+        path = os.path.join(self._directory, library_name + '.txt')
+        _logger.info('Loading keywords of {0} from {1}'.format(library_name, path))
+
+        try:
+            with open(path, 'r') as f:
+                return tuple(line.strip() for line in f if line.strip())
+        except IOError as e:
+            _logger.error('Could not load keywords of {0}: {1}'.format(library_name, e))
+            return ()
+
+
+library_keywords = LibraryKeywords()
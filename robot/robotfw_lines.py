@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+import re
+
+
+_LINE_END = re.compile(b'\n')
+
+
+class LineTable():
+    """ Offsets of the lines of a buffer, built once per buffer revision.
+
+    contents are UTF-8 encoded, as the parser reads them. Lines are found
+    with a list access, and columns counted in characters are converted to
+    the byte offsets ycmd and the parser use. Lines of ASCII only text, the
+    common case, are never decoded.
+    """
+
+    def __init__(self, contents):
+        self.contents = contents
+
+        # Offset of the first byte of every line, and one past the end
+        self._starts = [0]
+        self._starts.extend(match.end() for match in _LINE_END.finditer(contents))
+        if self._starts[-1] != len(contents):
+            self._starts.append(len(contents))
+
+
+    def __len__(self):
+        """ Number of lines """
+        return len(self._starts) - 1
+
+
+    def line(self, line_num):
+        """ Line line_num (0-based) without its line break, None past the end """
+        if not 0 <= line_num < len(self._starts) - 1:
+            return None
+
+        return self.contents[self._starts[line_num]:self._starts[line_num + 1]].rstrip(b'\r\n')
+
+
+    def byte_column(self, line_num, char_column):
+        """ Byte column of the character char_column of line line_num """
+        line = self.line(line_num) or b''
+        if _is_ascii(line):
+            return min(char_column, len(line))
+
+        return len(line.decode('utf-8', 'replace')[:char_column].encode('utf-8'))
+
+
+def _is_ascii(text):
+    try:
+        text.decode('ascii')
+    except UnicodeError:
+        return False
+
+    return True
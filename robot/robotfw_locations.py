@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+import bisect
+
+from robotfw_diagnostics import embedded_pattern, extended_base, normalize_name, normalize_variable, strip_bdd_prefix
+
+
+# Cells of body settings and of the rows continuing them are recorded joined
+# by a separator, which can not occur inside a cell of the space separated format
+CELL_SEPARATOR = '    '
+
+
+def keyword_keys(call):
+    """ Normalized names a keyword call can refer to, the qualified name first """
+    call = strip_bdd_prefix(call)
+    keys = [normalize_name(call)]
+
+    dot = call.rfind('.')
+    if dot > 0:
+        keys.append(normalize_name(call[dot + 1:]))
+
+    return keys
+
+
+class FileLocations():
+    """ Where the symbols of one parsed file are defined and used.
+
+    Built in a single pass over the symbols its lines contributed. Names are
+    normalized, definitions are looked up with a dict access and references
+    come from a reverse index of the keyword call sites and variable uses.
+    Locations are (line, value) pairs, value being the text as it is written.
+    """
+
+    def __init__(self, line_symbols):
+        # kind -> normalized name -> (line, name) of the first definition
+        self.definitions = {'keyword' : {}, 'test_case' : {}, 'variable' : {}}
+        # (pattern, line, name) of keywords with embedded arguments
+        self.embedded = []
+        # kind -> normalized name -> [(line, value)]
+        self.references = {'keyword' : {}, 'variable' : {}}
+        # Normalized keyword name -> (arguments, documentation)
+        self.docs = {}
+
+        keyword = None
+        # Kind of the body setting the previous row recorded, continued by '...' rows
+        continued = None
+        documentation = []
+        arguments = []
+
+        def close_keyword():
+            if keyword is not None and keyword not in self.docs:
+                self.docs[keyword] = (arguments, ' '.join(documentation))
+
+        for line_no, contributions in enumerate(line_symbols):
+            if not contributions:
+                continue
+
+            setting = None
+            for kind, value in contributions:
+                if kind in self.definitions:
+                    key = normalize_variable(value) if kind == 'variable' else normalize_name(value)
+                    if key not in self.definitions[kind]:
+                        self.definitions[kind][key] = (line_no, value)
+
+                    if kind == 'keyword':
+                        close_keyword()
+                        keyword, documentation, arguments = key, [], []
+                        if '${' in value:
+                            self.embedded.append((embedded_pattern(value), line_no, value))
+                    elif kind == 'test_case':
+                        close_keyword()
+                        keyword, documentation, arguments = None, [], []
+                elif kind == 'call':
+                    for key in keyword_keys(value):
+                        self.references['keyword'].setdefault(key, []).append((line_no, value))
+                elif kind == 'use':
+                    self.references['variable'].setdefault(normalize_variable(value), []).append((line_no, value))
+                elif kind == 'documentation':
+                    setting = kind
+                    documentation.append(value)
+                elif kind == 'arguments':
+                    setting = kind
+                    arguments.extend(value.split(CELL_SEPARATOR))
+                elif kind == 'continuation':
+                    setting = continued
+                    if continued == 'documentation':
+                        documentation.append(value)
+                    elif continued == 'arguments':
+                        arguments.extend(value.split(CELL_SEPARATOR))
+
+            continued = setting
+
+        close_keyword()
+
+
+    def definition(self, kind, name):
+        """ (line, name) defining name, None if this file does not """
+        if kind == 'keyword':
+            for key in keyword_keys(name):
+                found = self.definitions['keyword'].get(key)
+                if found is not None:
+                    return found
+
+            call = strip_bdd_prefix(name)
+            for pattern, line_no, value in self.embedded:
+                if pattern.match(call):
+                    return (line_no, value)
+
+            return None
+
+        if kind == 'variable':
+            found = self.definitions['variable'].get(normalize_variable(name))
+            if found is None and extended_base(name):
+                # ${obj.attr} is defined where ${obj} is
+                found = self.definitions['variable'].get(extended_base(name))
+
+            return found
+
+        return self.definitions[kind].get(normalize_name(name))
+
+
+    def uses(self, kind, name):
+        """ (line, value) of every call of a keyword or use of a variable """
+        if kind == 'variable':
+            return self.references['variable'].get(normalize_variable(name), [])
+
+        key = normalize_name(name)
+        if '${' not in name:
+            return self.references['keyword'].get(key, [])
+
+        # Calls of a keyword with embedded arguments only match its pattern
+        pattern = embedded_pattern(name)
+        calls = set(call for calls in self.references['keyword'].values() for call in calls)
+        return sorted(call for call in calls if pattern.match(strip_bdd_prefix(call[1])))
+
+
+    def doc(self, name):
+        """ (arguments, documentation) of a keyword defined in this file, None otherwise """
+        found = self.definition('keyword', name)
+        if found is None:
+            return None
+
+        return self.docs.get(normalize_name(found[1]))
+
+
+class BodyIndex():
+    """ Line ranges of the test case and keyword bodies of a file, with the
+    variables each body defines locally.
+
+    Bodies do not overlap, so the one a line belongs to is found by binary
+    search over their first lines. A body ends before the next one or the
+    next table header starts. Locals are kept in line order per body, the
+    ones defined before a line are a prefix of them.
+    """
+
+    def __init__(self, line_symbols, table_starts):
+        self.starts = []
+        self.ends = []
+        # Per body: [(line, variable)] of its locals and their lines
+        self._locals = []
+        self._local_lines = []
+
+        table_starts = set(table_starts)
+        line_count = len(line_symbols)
+
+        def close(end):
+            if len(self.ends) < len(self.starts):
+                self.ends.append(end)
+
+        for line_no, contributions in enumerate(line_symbols):
+            if line_no in table_starts:
+                close(line_no - 1)
+
+            if not contributions:
+                continue
+
+            for kind, value in contributions:
+                if kind in ('test_case', 'keyword'):
+                    close(line_no - 1)
+                    self.starts.append(line_no)
+                    self._locals.append([])
+                    self._local_lines.append([])
+                elif kind == 'local' and len(self.ends) < len(self.starts):
+                    self._locals[-1].append((line_no, value))
+                    self._local_lines[-1].append(line_no)
+
+        close(line_count - 1)
+
+
+    def body_at(self, line_no):
+        """ Number of the body line_no is in, None outside of bodies """
+        body = bisect.bisect_right(self.starts, line_no) - 1
+        if body < 0 or line_no > self.ends[body]:
+            return None
+
+        return body
+
+
+    def locals_at(self, line_no):
+        """ (line, variable) of the locals defined before line_no in its body.
+        Those of the first line, e.g. embedded arguments, are always in scope. """
+        body = self.body_at(line_no)
+        if body is None:
+            return []
+
+        cutoff = bisect.bisect_right(self._local_lines[body], max(line_no - 1, self.starts[body]))
+        return self._locals[body][:cutoff]
+
+
+    def local_definition(self, line_no, variable):
+        """ (line, variable) of the closest definition of variable at or before
+        line_no in its body, None if the body does not define it """
+        key = normalize_variable(variable)
+        body = self.body_at(line_no)
+        if body is None:
+            return None
+
+        cutoff = bisect.bisect_right(self._local_lines[body], line_no)
+        for found in reversed(self._locals[body][:cutoff]):
+            if normalize_variable(found[1]) == key:
+                return found
+
+        return None
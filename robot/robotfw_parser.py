@@ -1,10 +1,27 @@
 #!/usr/bin/env python
 
-import json
+import bisect
+import collections
+import copy
 import logging
 import os
-import string
-import subprocess
+import re
+import time
+
+from robotfw_cache import resource_cache
+from robotfw_catalog import library_catalog
+from robotfw_diagnostics import (ERROR, WARNING, KeywordIndex, VariableIndex, assigned_variable, is_assignment,
+                                 normalize_name, normalize_variable, strip_bdd_prefix,
+                                 variable_spans, variables_in)
+from robotfw_graph import SymbolUnion, resource_graph
+from robotfw_index import CandidateIndex, fuzzy_lookup, strip_variable_decoration, variable_key
+from robotfw_libraries import library_keywords
+from robotfw_locations import CELL_SEPARATOR, BodyIndex, FileLocations
+from robotfw_resolver import resource_resolver
+from robotfw_stats import stats
+from robotfw_symbols import (KEYWORD_SETTING, LIBRARY, LIBRARY_KEYWORD, SETTING, TEST_CASE_SETTING, VARIABLE, Symbol,
+                              intern_name, parser_kinds)
+from robotfw_tokenizer import tokenizer_for
 
 
 _logger = logging.getLogger(__name__)
@@ -19,171 +36,118 @@ valid_table_names = setting_table_names + variable_table_names + test_case_table
 
 setting_table_settings = ['Suite Setup', 'Suite Teardown', 'Test Setup', 'Test Teardown', 'Force Tags', 'Default Tags', 'Resource', 'Library']
 test_case_settings = ['Documentation', 'Tags', 'Setup', 'Precondition', 'Teardown', 'Postcondition', 'Template', 'Timeout']
+keyword_settings = ['Documentation', 'Arguments', 'Return', 'Teardown', 'Tags', 'Timeout']
 
-library_names = ['ArchiveLibrary', 'Collections', 'DateTime', 'Dialogs', 'OperatingSystem', 'Process', 'Remote', 'Screenshot', 'Selenium2Library', 'SSHLibrary', 'String', 'Telnet', 'XML']
-
-library_keywords = {
-        'ArchiveLibrary' : [
-            'Archive Should Contain File', 'Extract Tar File', 'Extract Zip File'
-            ],
-        'BuiltIn' : [
-            'Call Method', 'Catenate', 'Comment', 'Continue For Loop', 'Continue For Loop If', 'Convert To Binary',
-            'Convert To Boolean', 'Convert To Bytes', 'Convert To Hex', 'Convert To Integer', 'Convert To Number',
-            'Convert To Octal', 'Convert To String', 'Create Dictionary', 'Create List', 'Evaluate', 'Exit For Loop',
-            'Exit For Loop If', 'Fail', 'Fatal Error', 'Get Count', 'Get Length', 'Get Library Instance', 'Get Time',
-            'Get Variable Value', 'Get Variables', 'Import Library', 'Import Resource', 'Import Variables',
-            'Keyword Should Exist', 'Length Should Be', 'Log', 'Log Many', 'Log To Console', 'Log Variables',
-            'No Operation', 'Pass Execution', 'Pass Execution If', 'Regexp Escape', 'Reload Library', 'Remove Tags',
-            'Repeat Keyword', 'Replace Variables', 'Return From Keyword', 'Return From Keyword If', 'Run Keyword',
-            'Run Keyword And Continue On Failure', 'Run Keyword And Expect Error', 'Run Keyword And Ignore Error',
-            'Run Keyword And Return', 'Run Keyword And Return If', 'Run Keyword And Return Status', 'Run Keyword If',
-            'Run Keyword If All Critical Tests Passed', 'Run Keyword If All Tests Passed',
-            'Run Keyword If Any Critical Tests Failed', 'Run Keyword If Any Tests Failed',
-            'Run Keyword If Test Failed', 'Run Keyword If Test Passed', 'Run Keyword If Timeout Occurred',
-            'Run Keyword Unless', 'Run Keywords', 'Set Global Variable', 'Set Library Search Order', 'Set Log Level',
-            'Set Suite Documentation', 'Set Suite Metadata', 'Set Suite Variable', 'Set Tags',
-            'Set Test Documentation', 'Set Test Message', 'Set Test Variable', 'Set Variable', 'Set Variable If',
-            'Should Be Empty', 'Should Be Equal', 'Should Be Equal As Integers', 'Should Be Equal As Numbers',
-            'Should Be Equal As Strings', 'Should Be True', 'Should Contain', 'Should Contain X Times',
-            'Should End With', 'Should Match', 'Should Match Regexp', 'Should Not Be Empty', 'Should Not Be Equal',
-            'Should Not Be Equal As Integers', 'Should Not Be Equal As Numbers', 'Should Not Be Equal As Strings',
-            'Should Not Be True', 'Should Not Contain', 'Should Not End With', 'Should Not Match',
-            'Should Not Match Regexp', 'Should Not Start With', 'Should Start With', 'Sleep', 'Variable Should Exist',
-            'Variable Should Not Exist', 'Wait Until Keyword Succeeds'
-            ],
-        'Collections' : [
-            'Append To List', 'Combine Lists', 'Convert To Dictionary', 'Convert To List', 'Copy Dictionary',
-            'Copy List', 'Count Values In List', 'Dictionaries Should Be Equal', 'Dictionary Should Contain Item',
-            'Dictionary Should Contain Key', 'Dictionary Should Contain Sub Dictionary',
-            'Dictionary Should Contain Value', 'Dictionary Should Not Contain Key',
-            'Dictionary Should Not Contain Value', 'Get Dictionary Items', 'Get Dictionary Keys',
-            'Get Dictionary Values', 'Get From Dictionary', 'Get From List', 'Get Index From List', 'Get Match Count',
-            'Get Matches', 'Get Slice From List', 'Insert Into List', 'Keep In Dictionary',
-            'List Should Contain Sub List', 'List Should Contain Value', 'List Should Not Contain Duplicates',
-            'List Should Not Contain Value', 'Lists Should Be Equal', 'Log Dictionary', 'Log List',
-            'Pop From Dictionary', 'Remove Duplicates', 'Remove From Dictionary', 'Remove From List',
-            'Remove Values From List', 'Reverse List', 'Set List Value', 'Set To Dictionary', 'Should Contain Match',
-            'Should Not Contain Match', 'Sort List'
-            ],
-        'DateTime' : [
-            'Add Time To Date', 'Add Time To Time', 'Convert Date', 'Convert Time', 'Get Current Date',
-            'Subtract Date From Date', 'Subtract Time From Date', 'Subtract Time From Time'
-            ],
-        'Dialogs' : [
-            'Execute Manual Step', 'Get Selection From User', 'Get Value From User', 'Pause Execution'
-            ],
-        'OperatingSystem' : [
-            'Append To Environment Variable', 'Append To File', 'Copy Directory', 'Copy File', 'Copy Files',
-            'Count Directories In Directory', 'Count Files In Directory', 'Count Items In Directory',
-            'Create Binary File', 'Create Directory', 'Create File', 'Directory Should Be Empty',
-            'Directory Should Exist', 'Directory Should Not Be Empty', 'Directory Should Not Exist', 'Empty Directory',
-            'Environment Variable Should Be Set', 'Environment Variable Should Not Be Set', 'File Should Be Empty',
-            'File Should Exist', 'File Should Not Be Empty', 'File Should Not Exist', 'Get Binary File',
-            'Get Environment Variable', 'Get Environment Variables', 'Get File', 'Get File Size', 'Get Modified Time',
-            'Grep File', 'Join Path', 'Join Paths', 'List Directories In Directory', 'List Directory',
-            'List Files In Directory', 'Log Environment Variables', 'Log File', 'Move Directory', 'Move File',
-            'Move Files', 'Normalize Path', 'Read Process Output', 'Remove Directory', 'Remove Environment Variable',
-            'Remove File', 'Remove Files', 'Run', 'Run And Return Rc', 'Run And Return Rc And Output',
-            'Set Environment Variable', 'Set Modified Time', 'Should Exist', 'Should Not Exist', 'Split Extension',
-            'Split Path', 'Start Process', 'Stop All Processes', 'Stop Process', 'Switch Process', 'Touch',
-            'Wait Until Created', 'Wait Until Removed'
-            ],
-        'Process' : [
-            'Get Process Id', 'Get Process Object', 'Get Process Result', 'Is Process Running', 'Join Command Line',
-            'Process Should Be Running', 'Process Should Be Stopped', 'Run Process', 'Send Signal To Process',
-            'Split Command Line', 'Start Process', 'Switch Process', 'Terminate All Processes', 'Terminate Process',
-            'Wait For Process'
-            ],
-        'Screenshot' : [
-            'Set Screenshot Directory', 'Take Screenshot', 'Take Screenshot Without Embedding'
-            ],
-        'Selenium2Library' : [
-            'Add Cookie', 'Add Location Strategy', 'Alert Should Be Present', 'Assign Id To Element',
-            'Capture Page Screenshot', 'Checkbox Should Be Selected', 'Checkbox Should Not Be Selected',
-            'Choose Cancel On Next Confirmation', 'Choose File', 'Choose Ok On Next Confirmation', 'Clear Element Text',
-            'Click Button', 'Click Element', 'Click Element At Coordinates', 'Click Image', 'Click Link',
-            'Close All Browsers', 'Close Browser', 'Close Window', 'Confirm Action', 'Create Webdriver',
-            'Current Frame Contains', 'Current Frame Should Not Contain', 'Delete All Cookies', 'Delete Cookie',
-            'Dismiss Alert', 'Double Click Element', 'Drag And Drop', 'Drag And Drop By Offset',
-            'Element Should Be Disabled', 'Element Should Be Enabled', 'Element Should Be Visible',
-            'Element Should Contain', 'Element Should Not Be Visible', 'Element Should Not Contain',
-            'Element Text Should Be', 'Execute Async Javascript', 'Execute Javascript', 'Focus', 'Frame Should Contain',
-            'Get Alert Message', 'Get All Links', 'Get Cookie Value', 'Get Cookies', 'Get Element Attribute',
-            'Get Horizontal Position', 'Get List Items', 'Get Location', 'Get Matching Xpath Count',
-            'Get Selected List Label', 'Get Selected List Labels', 'Get Selected List Value',
-            'Get Selected List Values', 'Get Selenium Implicit Wait', 'Get Selenium Speed', 'Get Selenium Timeout',
-            'Get Source', 'Get Table Cell', 'Get Text', 'Get Title', 'Get Value', 'Get Vertical Position',
-            'Get Webelement', 'Get Webelements', 'Get Window Identifiers', 'Get Window Names', 'Get Window Position',
-            'Get Window Size', 'Get Window Titles', 'Go Back', 'Go To', 'Input Password', 'Input Text',
-            'Input Text Into Prompt', 'List Selection Should Be', 'List Should Have No Selections', 'List Windows',
-            'Location Should Be', 'Location Should Contain', 'Locator Should Match X Times', 'Log Location',
-            'Log Source', 'Log Title', 'Maximize Browser Window', 'Mouse Down', 'Mouse Down On Image',
-            'Mouse Down On Link', 'Mouse Out', 'Mouse Over', 'Mouse Up', 'Open Browser', 'Open Context Menu',
-            'Page Should Contain', 'Page Should Contain Button', 'Page Should Contain Checkbox',
-            'Page Should Contain Element', 'Page Should Contain Image', 'Page Should Contain Link',
-            'Page Should Contain List', 'Page Should Contain Radio Button', 'Page Should Contain Textfield',
-            'Page Should Not Contain', 'Page Should Not Contain Button', 'Page Should Not Contain Checkbox',
-            'Page Should Not Contain Element', 'Page Should Not Contain Image', 'Page Should Not Contain Link',
-            'Page Should Not Contain List', 'Page Should Not Contain Radio Button', 'Page Should Not Contain Textfield',
-            'Press Key', 'Radio Button Should Be Set To', 'Radio Button Should Not Be Selected',
-            'Register Keyword To Run On Failure', 'Reload Page', 'Remove Location Strategy', 'Select All From List',
-            'Select Checkbox', 'Select Frame', 'Select From List', 'Select From List By Index',
-            'Select From List By Label', 'Select From List By Value', 'Select Radio Button', 'Select Window',
-            'Set Browser Implicit Wait', 'Set Screenshot Directory', 'Set Selenium Implicit Wait', 'Set Selenium Speed',
-            'Set Selenium Timeout', 'Set Window Position', 'Set Window Size', 'Simulate', 'Submit Form',
-            'Switch Browser', 'Table Cell Should Contain', 'Table Column Should Contain', 'Table Footer Should Contain',
-            'Table Header Should Contain', 'Table Row Should Contain', 'Table Should Contain',
-            'Textarea Should Contain', 'Textarea Value Should Be', 'Textfield Should Contain',
-            'Textfield Value Should Be', 'Title Should Be', 'Unselect Checkbox', 'Unselect Frame', 'Unselect From List',
-            'Unselect From List By Index', 'Unselect From List By Label', 'Unselect From List By Value',
-            'Wait For Condition', 'Wait Until Element Contains', 'Wait Until Element Does Not Contain',
-            'Wait Until Element Is Enabled', 'Wait Until Element Is Not Visible', 'Wait Until Element Is Visible',
-            'Wait Until Page Contains', 'Wait Until Page Contains Element', 'Wait Until Page Does Not Contain',
-            'Wait Until Page Does Not Contain Element', 'Xpath Should Match X Times'
-            ],
-        'SSHLibrary' : [
-            'Close All Connections', 'Close Connection', 'Directory Should Exist', 'Directory Should Not Exist',
-            'Enable Ssh Logging', 'Execute Command', 'File Should Exist', 'File Should Not Exist', 'Get Connection',
-            'Get Connections', 'Get Directory', 'Get File', 'List Directories In Directory', 'List Directory',
-            'List Files In Directory', 'Login', 'Login With Public Key', 'Open Connection', 'Put Directory', 'Put File',
-            'Read', 'Read Command Output', 'Read Until', 'Read Until Prompt', 'Read Until Regexp',
-            'Set Client Configuration', 'Set Default Configuration', 'Start Command', 'Switch Connection', 'Write',
-            'Write Bare', 'Write Until Expected Output'
-            ],
-        'String' : [
-            'Convert To Lowercase', 'Convert To Uppercase', 'Decode Bytes To String', 'Encode String To Bytes',
-            'Fetch From Left', 'Fetch From Right', 'Generate Random String', 'Get Line', 'Get Line Count',
-            'Get Lines Containing String', 'Get Lines Matching Pattern', 'Get Lines Matching Regexp',
-            'Get Regexp Matches', 'Get Substring', 'Remove String', 'Remove String Using Regexp', 'Replace String',
-            'Replace String Using Regexp', 'Should Be Byte String', 'Should Be Lowercase', 'Should Be String',
-            'Should Be Titlecase', 'Should Be Unicode String', 'Should Be Uppercase', 'Should Not be String',
-            'Split String', 'Split String From Right', 'Split String To Characters', 'Split To Lines'
-            ],
-        'Telnet' : [
-            'Close All Connections', 'Close Connection', 'Execute Command', 'Login', 'Open Connection', 'Read',
-            'Read Until', 'Read Until Prompt', 'Read Until Regexp', 'Set Default Log Level', 'Set Encoding',
-            'Set Newline', 'Set Prompt', 'Set Telnetlib Log Level', 'Set Timeout', 'Switch Connection', 'Write',
-            'Write Bare', 'Write Control Character', 'Write Until Expected Output'
-            ],
-        'XML' : [
-            'Add Element', 'Clear Element', 'Copy Element', 'Element Attribute Should Be',
-            'Element Attribute Should Match', 'Element Should Exist', 'Element Should Not Exist',
-            'Element Should Not Have Attribute', 'Element Text Should Be', 'Element Text Should Match',
-            'Element To String', 'Elements Should Be Equal', 'Elements Should Match', 'Evaluate Xpath',
-            'Get Child Elements', 'Get Element', 'Get Element Attribute', 'Get Element Attributes', 'Get Element Count',
-            'Get Element Text', 'Get Elements', 'Get Elements Texts', 'Log Element', 'Parse Xml', 'Remove Element',
-            'Remove Element Attribute', 'Remove Element Attributes', 'Remove Elements', 'Remove Elements Attribute',
-            'Remove Elements Attributes', 'Save Xml', 'Set Element Attribute', 'Set Element Tag', 'Set Element Text',
-            'Set Elements Attribute', 'Set Elements Tag', 'Set Elements Text'
-            ]
-        }
+# Settings whose value is a keyword to run, in the settings table and as [Setting] in bodies
+keyword_setting_names = ['Suite Setup', 'Suite Teardown', 'Test Setup', 'Test Teardown', 'Test Template']
+tag_setting_names = ['Force Tags', 'Default Tags']
+
+default_variables = frozenset(['${EMPTY}', '${True}', '${False}'])
+default_libraries = frozenset(['BuiltIn'])
+
+# Pools set up by configure_resource_loading()
+_resource_thread_pool = None
+_resource_process_pool = None
+
+# Lines parsed between checks whether a parse has been cancelled
+CANCEL_CHECK_INTERVAL = 256
+
+# Kinds of symbols a single line can contribute. Besides definitions, lines
+# record the keywords they call, the variables they use and define locally,
+# templates, variable files, Resource settings that could not be resolved and
+# the documentation and arguments of keywords, with the rows continuing them.
+symbol_kinds = ['keyword', 'test_case', 'tag', 'variable', 'library', 'library_path', 'alias', 'resource',
+                'call', 'use', 'local', 'template', 'suite_template', 'variable_file', 'missing_resource',
+                'documentation', 'arguments', 'continuation']
+
+# First cells of body rows that are control structures rather than keyword calls
+loop_markers = frozenset(['FOR', ':FOR'])
+condition_markers = frozenset(['IF', 'ELSE IF', 'WHILE', 'RETURN'])
+block_markers = frozenset(['END', 'ELSE', 'TRY', 'FINALLY', 'BREAK', 'CONTINUE'])
+
+# Keywords whose first argument names a variable they define, normalized
+variable_setters = frozenset(['settestvariable', 'settaskvariable', 'setsuitevariable', 'setglobalvariable'])
+# Keywords whose first argument names a variable of the current body, normalized
+local_variable_setters = frozenset(['setlocalvariable'])
+
+# Libraries completed in Library settings: the bundled ones but BuiltIn, which
+# is always imported, and Remote, whose keywords only the remote server knows
+library_names = sorted((set(library_keywords) - set(['BuiltIn'])) | set(['Remote']), key=str.lower)
+
+
+_setting_index = CandidateIndex([Symbol(setting, SETTING) for setting in setting_table_settings])
+_test_case_setting_index = CandidateIndex([Symbol('[{0}]'.format(tcs), TEST_CASE_SETTING)
+                                           for tcs in test_case_settings])
+_keyword_setting_index = CandidateIndex([Symbol('[{0}]'.format(ks), KEYWORD_SETTING) for ks in keyword_settings])
+_library_candidates = [Symbol(lib, LIBRARY) for lib in library_names]
+
+# Per library (catalog revision, keyword index), built the first time a library is used
+_library_keyword_indexes = {}
+
+
+# Per library (keyword index, normalized keyword name -> name), see _library_keyword_names()
+_library_keyword_name_sets = {}
+
+
+def _library_keyword_index(library_name):
+    """ library_name is the name of a library, or the path of the source of
+    a Python library, see RobotFrameworkParser._catalog_name() """
+    revision = library_catalog.revision
+    cached = _library_keyword_indexes.get(library_name)
+
+    if cached is not None and cached[0] in (None, revision):
+        return cached[1]
+
+    keywords = library_keywords.get(library_name)
+    if keywords is not None:
+        # Built in libraries never change
+        revision = None
+    else:
+        keywords = library_catalog.keywords(library_name) or []
+
+    label = os.path.splitext(os.path.basename(library_name))[0] if os.path.isabs(library_name) else library_name
+    index = CandidateIndex([Symbol(kw, LIBRARY_KEYWORD, label) for kw in keywords])
+    _library_keyword_indexes[library_name] = (revision, index)
+
+    return index
+
+
+def _library_keyword_names(library_name):
+    """ Normalized names of the keywords of a library mapped to their names,
+    None if the library is unknown """
+    if library_name not in library_keywords and library_catalog.keywords(library_name) is None:
+        return None
+
+    index = _library_keyword_index(library_name)
+    cached = _library_keyword_name_sets.get(library_name)
+
+    # Rebuilt along with the keyword index of the library
+    if cached is None or cached[0] is not index:
+        cached = (index, dict((normalize_name(symbol.name), symbol.name) for symbol in index))
+        _library_keyword_name_sets[library_name] = cached
+
+    return cached[1]
+
+
+class ParseCancelled(Exception):
+    """ Raised when the cancelled callback of a parser asks it to stop """
+    pass
 
 
 class RobotFrameworkParser():
     
-    def __init__(self, filename, contents, parent=None):
+    def __init__(self, filename, contents, is_resource=False, cancelled=None, state=None):
+        """ Parse contents of filename.
+
+        A resource can instead be restored from the state() saved by an
+        earlier parse of the same contents, without reading them.
+        """
         self.filename_ = filename
-        self.parent_ = parent
+        self.is_resource_ = is_resource
+
+        # Polled while parsing, raises ParseCancelled once it returns True.
+        # Only full parses can be cancelled, edits of a few lines run to completion.
+        self._cancelled = cancelled
 
         self.defined_keywords = set()
         self.defined_tags = set()
@@ -195,254 +159,789 @@ class RobotFrameworkParser():
         self.imported_resources = set()
         self.imported_libraries = set()
 
-        self.defined_variables.add('${EMPTY}')
-        self.defined_variables.add('${True}')
-        self.defined_variables.add('${False}')
+        # Resolved paths of the Resource settings in this file, in order
+        self.resource_paths = []
+
+        # Parsed resources imported directly or indirectly, in import order
+        self._resource_nodes = []
+
+        # Bumped every time the symbols change
+        self.revision = 0
+
+        # (revision, kind -> {name: Symbol}) of this file's own symbols
+        self._records = None
+
+        # (revision, value) of the name indexes, diagnostics, symbol locations
+        # and test case and keyword bodies
+        self._name_index_cache = None
+        self._diagnostics = None
+        self._locations = None
+        self._bodies = None
+
+        # ((revision, body, locals), index) of the last local variable candidates
+        self._local_index = None
+
+        if not is_resource:
+            resource_resolver.begin_pass()
+
+        if state is not None:
+            self._restore(state)
+        else:
+            self._parse(contents)
+
+        self._import_resources()
+        self._collect_symbols()
+
+        self._cancelled = None
+
+
+    def update(self, contents):
+        """ Re-parse after the buffer changed to contents, in place.
+
+        Only the lines between the unchanged head and tail of the buffer are
+        processed again; the symbols contributed by the replaced lines are
+        dropped first. Edits that add or remove a table header fall back to
+        a full parse, as they change the table of every following line.
+        """
+        edit = self._edit(contents)
+        resource_resolver.begin_pass()
+
+        if edit is None:
+            self._parse(contents)
+        else:
+            self._apply_edit(*edit)
+
+        self._import_resources()
+        self._collect_symbols()
+
+
+    def updated(self, contents, cancelled=None):
+        """ A parser of contents, the buffer this parser parsed after an edit.
+
+        Works like update() but leaves this parser untouched, so that other
+        threads can keep reading it meanwhile. Edits of a few lines are
+        applied to a copy, the others are parsed from scratch by a new
+        parser, which can be cancelled like any other.
+        """
+        edit = self._edit(contents)
+        if edit is None:
+            return RobotFrameworkParser(self.filename_, contents, cancelled=cancelled)
+
+        parser = copy.copy(self)
+        # The copy changes the symbols of single lines and their counters,
+        # the contributions of the lines themselves are replaced, not changed
+        parser._line_symbols = list(self._line_symbols)
+        parser._own_symbols = dict((kind, collections.Counter(counter))
+                                   for kind, counter in self._own_symbols.items())
+
+        resource_resolver.begin_pass()
+        parser._apply_edit(*edit)
+        parser._import_resources()
+        parser._collect_symbols()
+
+        return parser
+
+
+    def refreshed(self, paths):
+        """ Like refresh_resources(), on a copy. Returns this parser if it
+        does not import any of the resources at paths. """
+        if self.is_resource_ or not set(paths) & self.imported_resources:
+            return self
+
+        # Refreshing only replaces the resource nodes and the combined symbols
+        parser = copy.copy(self)
+        parser.refresh_resources(paths)
+
+        return parser
+
+
+    def _edit(self, contents):
+        """ (new lines, start, old end, new end, tokenized new lines) of the
+        lines that differ in contents, None if contents must be parsed from
+        scratch as the format or the table layout changed """
+        old_lines = self._lines
+        new_lines = contents.splitlines()
+
+        start = 0
+        limit = min(len(old_lines), len(new_lines))
+        while start < limit and old_lines[start] == new_lines[start]:
+            start += 1
+
+        old_end = len(old_lines)
+        new_end = len(new_lines)
+        while old_end > start and new_end > start and old_lines[old_end - 1] == new_lines[new_end - 1]:
+            old_end -= 1
+            new_end -= 1
+
+        if start == old_end and start == new_end:
+            return (new_lines, start, old_end, new_end, [])
+
+        with stats.timer('tokenize'):
+            tokenizer = tokenizer_for(self.filename_, new_lines)
+            added_cells = [tokenizer.cells(line) for line in new_lines[start:new_end]]
+
+        header_removed = any(start <= line_no < old_end for line_no in self._table_starts)
+        header_added = any(cells and cells[0].startswith('*') for cells in added_cells)
 
-        self.imported_libraries.add('BuiltIn')
+        if tokenizer is not self._tokenizer:
+            _logger.info('Format of {0} changed to {1}'.format(self.filename_, tokenizer.format))
+            return None
+        elif header_removed or header_added:
+            _logger.info('Table layout changed, parsing {0} from scratch'.format(self.filename_))
+            return None
 
-        self._parse(contents)
+        return (new_lines, start, old_end, new_end, added_cells)
+
+
+    def _apply_edit(self, new_lines, start, old_end, new_end, added_cells):
+        if start == old_end and start == new_end:
+            return
+
+        _logger.info('Re-parsing lines {0}-{1} of {2}'.format(start, new_end, self.filename_))
+        stats.count('incremental_updates')
+
+        with stats.timer('table_parse'):
+            self._replace_lines(new_lines, start, old_end, new_end, added_cells)
+
+
+    def _replace_lines(self, new_lines, start, old_end, new_end, added_cells):
+        """ Replace lines start to old_end by the lines start to new_end of new_lines """
+        resources_changed = False
+        for line_no in range(start, old_end):
+            if self._remove_line_symbols(line_no):
+                resources_changed = True
+
+        delta = new_end - old_end
+        self._lines = new_lines
+        self._line_symbols[start:old_end] = [None] * (new_end - start)
+        self._table_starts = [line_no + delta if line_no >= old_end else line_no
+                              for line_no in self._table_starts]
+
+        for offset, cells in enumerate(added_cells):
+            if cells is None:
+                continue
+
+            line_no = start + offset
+            line_parser = self._line_parser(self._table_at(line_no))
+            if line_parser:
+                line_parser(line_no, cells)
+
+                if any(kind == 'resource' for kind, _ in self._line_symbols[line_no] or []):
+                    resources_changed = True
+
+        if resources_changed:
+            self.resource_paths = self._imported_paths()
+
+
+    def _imported_paths(self):
+        return [value
+                for contributions in self._line_symbols if contributions
+                for kind, value in contributions if kind == 'resource']
 
 
     def has_imported_resource(self, path):
-        if path in self.imported_resources:
-            return True
+        return path in self.imported_resources
+
+
+    def refresh_resources(self, paths):
+        """ Pick up the changes of the imported resource files at paths.
 
-        if self.parent_:
-            return self.parent_.has_imported_resource(path)
+        The new parse of a changed file replaces its old one among the
+        resources of this file, and the symbols are combined again. The
+        resource tree is only walked again when a changed file imports other
+        resources than before or can no longer be read.
+        """
+        paths = set(paths)
+        if self.is_resource_ or not paths & self.imported_resources:
+            return
 
-        return False
+        resource_resolver.begin_pass()
+        nodes = []
+
+        for node in self._resource_nodes:
+            if node.filename_ in paths:
+                refreshed = _load_resource(node.filename_)
+
+                if refreshed is None or refreshed.resource_paths != node.resource_paths:
+                    self._import_resources()
+                    break
+
+                node = refreshed
+
+            nodes.append(node)
+        else:
+            self._resource_nodes = nodes
+
+        self._collect_symbols()
 
 
     def _locate_resource(self, resource):
-        resource_dirs = resource.split(os.sep)
-        while resource_dirs and resource_dirs[0] == '..':
-            resource_dirs = resource_dirs[1:]
+        return resource_resolver.resolve(_expand_curdir(resource, self.filename_), self.filename_)
+
+
+    def _catalog_name(self, library_name):
+        """ Name of an imported library in the library catalog, the path of
+        its source for Python libraries next to the suite """
+        return self.library_paths.get(library_name, library_name)
+
 
-        parent_dirs = self.filename_.split(os.sep)[0:-1]
-        resource_path = str(os.sep).join(resource_dirs)
+    def _locate_python_library(self, library_name):
+        """ Source of a library implemented in a Python file next to the suite """
+        if library_name in library_keywords:
+            return None
 
-        while parent_dirs:
-            path = str(os.sep).join(parent_dirs) + os.sep + resource_path
-            if os.path.isfile(path):
-                return path
+        if library_name.endswith('.py'):
+            return resource_resolver.resolve(_expand_curdir(library_name, self.filename_), self.filename_)
 
-            parent_dirs = parent_dirs[0:-1]
+        if '.' not in library_name and os.sep not in library_name:
+            return resource_resolver.resolve(library_name + '.py', self.filename_)
 
         return None
 
 
-    def _import_resource(self, resource):
+    def _add_resource(self, line_no, resource):
         _logger.info('Importing resource {0} ...'.format(resource))
         path = self._locate_resource(resource)
         if path:
             _logger.info('    ... located file at {0}'.format(path))
+            self._add_symbol(line_no, 'resource', path)
+        else:
+            self._add_symbol(line_no, 'missing_resource', resource)
 
-            if not self.has_imported_resource(path):
-                try:
-                    contents = ''
-                    with open(path, 'r') as f:
-                        contents = f.read()
-
-                    self.imported_resources.add(path)
-                    parser = RobotFrameworkParser(path, contents, self)
-
-                    for tag in parser.defined_tags:
-                        self.defined_tags.add(tag)
-                    for tc in parser.defined_test_cases:
-                        self.defined_test_cases.add(tc)
-                    for kw in parser.defined_keywords:
-                        self.defined_keywords.add(kw)
-                    for v in parser.defined_variables:
-                        self.defined_variables.add(v)
-
-                    for alias, library_name in parser.defined_library_aliases.iteritems():
-                        self.defined_library_aliases[alias] = library_name
-
-                    for l in parser.imported_libraries:
-                        self.imported_libraries.add(l)
-                    for r in parser.imported_resources:
-                        self.imported_resources.add(r)
-                except Exception as e:
-                    _logger.error('An exception was thrown when attempting to parse {0}: {1}'.format(path, e.message))
 
-            else:
-                _logger.info('    ... already imported. Skipping.')
+    def _import_resources(self):
+        # Resources only record what they import; the importing test suite
+        # walks the whole resource tree so cached resources stay reusable.
+        if self.is_resource_:
+            return
+
+        with stats.timer('resource_import'):
+            self._walk_resources()
+
+
+    def _walk_resources(self):
+        loaded = None
+        if _resource_thread_pool and self.resource_paths:
+            loaded = _load_resources(self.resource_paths, self._cancelled)
+
+        def load(path):
+            if self._cancelled and self._cancelled():
+                raise ParseCancelled()
+
+            if loaded is not None and path in loaded:
+                return loaded[path]
+
+            return _load_resource(path)
+
+        # Walk in import order whether or not the files were loaded in
+        # parallel, so the result does not depend on which finished first.
+        self._resource_nodes = resource_graph.walk(self.resource_paths, load)
+        self.imported_resources = set(node.filename_ for node in self._resource_nodes)
+
+
+    def _add_symbol(self, line_no, kind, value):
+        value = intern_name(value)
+
+        contributions = self._line_symbols[line_no]
+        if contributions is None:
+            contributions = self._line_symbols[line_no] = []
+
+        contributions.append((kind, value))
+        self._own_symbols[kind][value] += 1
+
+
+    def _remove_line_symbols(self, line_no):
+        """ Forget what a line contributed, returns True if it imported a resource """
+        contributions = self._line_symbols[line_no]
+        if not contributions:
+            return False
+
+        imported_resource = False
+        for kind, value in contributions:
+            counter = self._own_symbols[kind]
+            counter[value] -= 1
+            if counter[value] <= 0:
+                del counter[value]
+
+            if kind == 'resource':
+                imported_resource = True
+
+        self._line_symbols[line_no] = None
+        return imported_resource
+
+
+    def _collect_symbols(self):
+        """ Combine the symbols of this file with those of its resources.
+
+        The symbols of the resources are referenced rather than copied; only
+        this file's own symbols are snapshot, as update() changes them.
+        """
+        started = time.time()
+        own = self._own_symbols
+        nodes = self._resource_nodes
+
+        def union(kind, defaults=()):
+            members = [defaults, frozenset(own[kind])]
+            members.extend(node._own_symbols[kind] for node in nodes)
+            return SymbolUnion(members)
+
+        self.defined_keywords = union('keyword')
+        self.defined_tags = union('tag')
+        self.defined_test_cases = union('test_case')
+        self.defined_variables = union('variable', default_variables)
+        self.imported_libraries = union('library', default_libraries)
+        self.variable_files = union('variable_file')
+        self.missing_resources = union('missing_resource')
+
+        # Library name -> source of the Python libraries imported by file
+        self.library_paths = dict(union('library_path'))
+
+        self.defined_library_aliases = {}
+        for node in nodes:
+            self.defined_library_aliases.update(list(node._own_symbols['alias']))
+        self.defined_library_aliases.update(list(own['alias']))
+
+        self._indexes = None
+        self._name_index_cache = None
+        self._diagnostics = None
+        self._locations = None
+        self._bodies = None
+        self.revision += 1
+
+        stats.add_time('merge', time.time() - started)
+
+
+    def _symbol_records(self):
+        """ Records of this file's own symbols by kind, at the line first defining them """
+        records = self._records
+        if records is not None and records[0] == self.revision:
+            return records[1]
+
+        revision = self.revision
+        by_kind = dict((kind, {}) for kind in parser_kinds)
+
+        for line_no, contributions in enumerate(self._line_symbols):
+            if contributions:
+                for kind, value in contributions:
+                    named = by_kind.get(kind)
+                    if named is not None and value not in named:
+                        named[value] = Symbol(value, parser_kinds[kind], self.filename_, line_no)
+
+        self._records = (revision, by_kind)
+        return by_kind
+
+
+    def _merged_records(self, kind):
+        """ Records of a kind from this file and its resources, the first definition wins """
+        merged = {}
+        for parser in [self] + self._resource_nodes:
+            for name, symbol in parser._symbol_records()[kind].items():
+                if name not in merged:
+                    merged[name] = symbol
+
+        return list(merged.values())
+
+
+    def _table_at(self, line_no):
+        """ Name of the table line_no belongs to, None outside known tables """
+        idx = bisect.bisect_left(self._table_starts, line_no) - 1
+
+        if idx < 0:
+            return None
+
+        return self._table_names[idx]
+
+
+    def _line_parser(self, table_name):
+        if table_name == "Settings":
+            return self._parse_setting_line
+        elif table_name == "Variables":
+            return self._parse_variable_line
+        elif table_name == "Test Cases":
+            return self._parse_test_case_line
+        elif table_name == "Keywords":
+            return self._parse_keyword_line
+
+        return None
 
 
     def _parse(self, contents):
-        lines_raw = contents.splitlines()
-        filtered_lines = []
+        """ Parse contents in a single pass over its lines.
+
+        Table headers switch the line parser that the following rows are
+        handed to, rows outside of a known table are ignored.
+        """
+        lines = self._lines = contents.splitlines()
+        self._tokenizer = tokenizer_for(self.filename_, lines)
+        self._line_symbols = [None] * len(lines)
+        self._own_symbols = _empty_symbol_counters()
+        self._table_starts = []
+        self._table_names = []
+
+        stats.count('files_parsed')
+        cells_of = self._tokenizer.cells
+        line_parser = None
 
-        for line in lines_raw:
-            if line:
-                parts = line.split('|')
-                if len(parts) > 2:
-                    parts = parts[1:-1]
-                    for p in range(0, len(parts)):
-                        parts[p] = parts[p].strip()
-                    filtered_lines.append(parts)
+        # Lines are handled in chunks, tokenized and then parsed, so the two
+        # phases can be timed separately while memory stays bounded
+        for chunk_start in range(0, len(lines), CANCEL_CHECK_INTERVAL):
+            if self._cancelled and self._cancelled():
+                raise ParseCancelled()
 
-        (table_name, filtered_lines) = self._skip_to_next_table(filtered_lines)
+            with stats.timer('tokenize'):
+                rows = [(line_no, cells_of(line))
+                        for line_no, line in enumerate(lines[chunk_start:chunk_start + CANCEL_CHECK_INTERVAL],
+                                                       chunk_start)]
 
-        while filtered_lines:
-            if table_name == "Settings":
-                filtered_lines = self._parse_settings(filtered_lines)
-            elif table_name == "Variables":
-                filtered_lines = self._parse_variables(filtered_lines)
-            elif table_name == "Test Cases":
-                filtered_lines = self._parse_test_cases(filtered_lines)
-            elif table_name == "Keywords":
-                filtered_lines = self._parse_keywords(filtered_lines)
+            with stats.timer('table_parse'):
+                for line_no, cells in rows:
+                    if cells is None:
+                        continue
+
+                    if cells[0].startswith('*'):
+                        table_name = _table_name(cells[0])
+
+                        self._table_starts.append(line_no)
+                        self._table_names.append(table_name)
+
+                        line_parser = self._line_parser(table_name)
+                    elif line_parser:
+                        line_parser(line_no, cells)
+
+        self.resource_paths = self._imported_paths()
+
+
+    def state(self):
+        """ What a resource parser is restored from, a picklable tuple.
+
+        Only the symbols each line contributed and the table layout are kept,
+        not the lines themselves, so a restored parser can not be updated
+        incrementally and parses its file again when it is.
+        """
+        line_symbols = [(line_no, tuple(contributions))
+                        for line_no, contributions in enumerate(self._line_symbols) if contributions]
+
+        return (len(self._line_symbols), line_symbols, list(self._table_starts), list(self._table_names))
+
+
+    def _restore(self, state):
+        line_count, line_symbols, self._table_starts, self._table_names = state
+
+        self._lines = []
+        self._tokenizer = None
+        self._line_symbols = [None] * line_count
+        self._own_symbols = own = _empty_symbol_counters()
+
+        # As _add_symbol() does, without its per symbol overhead
+        for line_no, contributions in line_symbols:
+            contributions = [(kind, intern_name(value)) for kind, value in contributions]
+            self._line_symbols[line_no] = contributions
+
+            for kind, value in contributions:
+                own[kind][value] += 1
+
+        self.resource_paths = self._imported_paths()
+
+
+    def _parse_keyword_line(self, line_no, cells):
+        first_cell_content = str(cells[0])
+
+        if first_cell_content:
+            _logger.info('Found keyword {0}'.format(first_cell_content))
+            self._add_symbol(line_no, 'keyword', first_cell_content)
+
+            # Embedded arguments are variables of the keyword's body
+            for variable in variables_in(first_cell_content):
+                self._add_symbol(line_no, 'local', variable)
+
+        self._parse_step(line_no, cells[1:])
+
+
+    def _parse_step(self, line_no, cells):
+        """ Record the keyword call, the variables used and the variables
+        defined by a row of a test case or keyword body """
+        cells = _code_cells(cells)
+
+        if cells and cells[0] == '\\':
+            # Body of an old style :FOR loop
+            cells = cells[1:]
+
+        if not cells:
+            return
+
+        first = cells[0]
+        marker = first.upper()
+
+        if first.startswith('[') and first.endswith(']'):
+            self._parse_body_setting(line_no, first[1:-1].strip().title(), cells[1:])
+        elif first == '...':
+            # Arguments continued from the previous row
+            self._add_symbol(line_no, 'continuation', CELL_SEPARATOR.join(cells[1:]))
+            self._add_uses(line_no, cells[1:])
+        elif marker in loop_markers:
+            # FOR ${a} ${b} IN ... defines the loop variables
+            for position, cell in enumerate(cells[1:], 1):
+                if cell.upper().startswith('IN'):
+                    self._add_uses(line_no, cells[position + 1:])
+                    break
+
+                self._add_symbol(line_no, 'local', cell)
+        elif marker == 'EXCEPT':
+            # EXCEPT pattern ... AS ${error}
+            if len(cells) > 2 and cells[-2].upper() == 'AS':
+                self._add_symbol(line_no, 'local', cells[-1])
+                cells = cells[:-2]
+            self._add_uses(line_no, cells[1:])
+        elif marker == 'VAR':
+            self._parse_var(line_no, cells[1:])
+        elif marker in condition_markers:
+            self._add_uses(line_no, cells[1:])
+        elif marker not in block_markers:
+            self._parse_call(line_no, cells)
+
+
+    def _parse_call(self, line_no, cells):
+        """ A keyword call, preceded by the variables it assigns """
+        assigned = 0
+        while assigned < len(cells) and is_assignment(cells[assigned]):
+            self._add_symbol(line_no, 'local', assigned_variable(cells[assigned]))
+            assigned += 1
+
+        if assigned == len(cells) or not cells[assigned]:
+            return
+
+        keyword = cells[assigned]
+        arguments = cells[assigned + 1:]
+
+        self._add_symbol(line_no, 'call', keyword)
+        self._add_uses(line_no, cells[assigned:assigned + 1])
+
+        setter = normalize_name(keyword)
+        if arguments and (setter in variable_setters or setter in local_variable_setters):
+            # Set Suite Variable ${name} defines ${name} for the other tests
+            # and keywords as well, Set Local Variable only for the rest of
+            # its body. The name may be escaped
+            name = arguments[0].lstrip('\\')
+            if not name.startswith(('$', '@', '&')):
+                name = '${' + name + '}'
+
+            kind = 'variable' if setter in variable_setters else 'local'
+            self._add_symbol(line_no, kind, assigned_variable(name))
+            arguments = arguments[1:]
+
+        self._add_uses(line_no, arguments)
+
+
+    def _parse_var(self, line_no, cells):
+        """ VAR ${name} value ... defines a local of its body, or a variable of
+        the other tests and keywords as well with a scope other than LOCAL """
+        if not cells:
+            return
+
+        values = []
+        scope = 'LOCAL'
+        for cell in cells[1:]:
+            option, _, value = cell.partition('=')
+            if option.lower() == 'scope':
+                scope = value.upper()
+            else:
+                values.append(cell)
 
-            if filtered_lines:
-                (table_name, filtered_lines) = self._skip_to_next_table(filtered_lines)
+        self._add_symbol(line_no, 'local' if scope == 'LOCAL' else 'variable', assigned_variable(cells[0]))
+        self._add_uses(line_no, values)
 
 
-    def _parse_keywords(self, lines):
-        for l in range(0, len(lines)):
-            cells = lines[l]
-            first_cell_content = str(cells[0])
+    def _parse_body_setting(self, line_no, setting, values):
+        if setting in ['Setup', 'Teardown', 'Precondition', 'Postcondition', 'Template']:
+            if values and values[0].upper() != 'NONE':
+                self._parse_call(line_no, values)
 
-            if first_cell_content.startswith('*'):
-                return lines[l:]
+            if setting == 'Template':
+                # Rows of a templated test are arguments, not keyword calls
+                self._add_symbol(line_no, 'template', values[0] if values else 'NONE')
+        elif setting == 'Documentation':
+            self._add_symbol(line_no, 'documentation', CELL_SEPARATOR.join(values))
+        elif setting == 'Arguments':
+            self._add_symbol(line_no, 'arguments', CELL_SEPARATOR.join(values))
+            for value in values:
+                name, _, default = value.partition('=')
+                self._add_symbol(line_no, 'local', name.strip())
+                self._add_uses(line_no, [default])
+        elif setting in ['Return', 'Timeout']:
+            self._add_uses(line_no, values)
 
-            if first_cell_content:
-                _logger.info('Found keyword {0}'.format(first_cell_content))
-                self.defined_keywords.add(first_cell_content)
 
-        return []
+    def _add_uses(self, line_no, cells):
+        for cell in cells:
+            for variable in variables_in(cell):
+                self._add_symbol(line_no, 'use', variable)
 
 
-    def _parse_library_setting(self, setting):
+    def _parse_library_setting(self, line_no, setting):
         setting_length = len(setting)
 
         if setting_length > 1:
             library_name = setting[1]
 
             _logger.info('Adding keywords from library {0}'.format(library_name))
-            self.imported_libraries.add(library_name)
+            self._add_symbol(line_no, 'library', library_name)
+
+            path = self._locate_python_library(library_name)
+            if path:
+                self._add_symbol(line_no, 'library_path', (library_name, path))
 
             if setting_length >= 4:
-                if str(setting[setting_length - 2]).upper() == "WITH NAME":
+                # AS since Robot Framework 6, which is case sensitive
+                if str(setting[setting_length - 2]).upper() == "WITH NAME" or setting[setting_length - 2] == "AS":
                     alias = setting[setting_length - 1]
 
                     _logger.info('Adding alias {0} for library {1}'.format(alias, library_name))
-                    self.defined_library_aliases[alias] = library_name
+                    self._add_symbol(line_no, 'alias', (alias, library_name))
 
 
-    def _parse_tags(self, tags):
+    def _parse_tags(self, line_no, tags):
         for tag in tags:
             tag = tag.strip()
             # Stop processing tags if we encounter a comment
             if str(tag).startswith('#'):
                 return
 
-            self.defined_tags.add(tag)
+            self._add_symbol(line_no, 'tag', tag)
 
 
-    def _parse_settings(self, lines):
-        for l in range(0, len(lines)):
-            cells = lines[l]
-            first_cell_content = str(cells[0])
+    def _parse_setting_line(self, line_no, cells):
+        first_cell_content = str(cells[0])
 
-            if first_cell_content.startswith('*'):
-                return lines[l:]
+        if first_cell_content == 'Resource':
+            if len(cells) > 1:
+                self._add_resource(line_no, cells[1])
+        elif first_cell_content == 'Library':
+            self._parse_library_setting(line_no, cells)
+        elif first_cell_content in tag_setting_names:
+            if len(cells) > 1:
+                self._parse_tags(line_no, cells[1:])
+        elif first_cell_content in keyword_setting_names:
+            values = _code_cells(cells[1:])
+            if values and values[0].upper() != 'NONE':
+                self._parse_call(line_no, values)
 
-            if first_cell_content == 'Resource':
-                if len(cells) > 1:
-                    self._import_resource(cells[1])
-            elif first_cell_content == 'Library':
-                self._parse_library_setting(cells)
-            elif first_cell_content in ['Force Tags', 'Default Tags']:
-                if len(cells) > 1:
-                    self._parse_tags(cells[1:])
+                if first_cell_content == 'Test Template':
+                    self._add_symbol(line_no, 'suite_template', values[0])
+        elif first_cell_content == 'Variables':
+            if len(cells) > 1:
+                self._add_symbol(line_no, 'variable_file', cells[1])
 
-        return []
 
+    def _parse_test_case_line(self, line_no, cells):
+        first_cell_content = str(cells[0])
 
-    def _parse_test_cases(self, lines):
-        for l in range(0, len(lines)):
-            cells = lines[l]
-            first_cell_content = str(cells[0])
+        if first_cell_content:
+            _logger.info('Found test case {0}'.format(first_cell_content))
+            self._add_symbol(line_no, 'test_case', first_cell_content)
 
-            if first_cell_content.startswith('*'):
-                return lines[l:]
+        if len(cells) > 2:
+            second_cell_content = str(cells[1]).strip()
 
-            if first_cell_content:
-                _logger.info('Found test case {0}'.format(first_cell_content))
-                self.defined_test_cases.add(first_cell_content)
+            if second_cell_content in ['[Tags]', 'Set Tags']:
+                self._parse_tags(line_no, cells[2:])
 
-            if len(cells) > 2:
-                second_cell_content = str(cells[1]).strip()
+        self._parse_step(line_no, cells[1:])
 
-                if second_cell_content in ['[Tags]', 'Set Tags']:
-                    self._parse_tags(cells[2:])
 
-        return []
+    def _parse_variable_line(self, line_no, cells):
+        first_cell_content = str(cells[0])
 
+        if first_cell_content:
+            _logger.info('Adding variable {0}'.format(first_cell_content))
+            self._add_symbol(line_no, 'variable', first_cell_content)
 
-    def _parse_variables(self, lines):
-        for l in range(0, len(lines)):
-            cells = lines[l]
-            first_cell_content = str(cells[0])
+        self._add_uses(line_no, _code_cells(cells[1:]))
 
-            if first_cell_content.startswith('*'):
-                return lines[l:]
 
-            if first_cell_content:
-                _logger.info('Adding variable {0}'.format(first_cell_content))
-                self.defined_variables.add(first_cell_content)
+    def _context(self, line, line_num, idx):
+        """ Table, column, cells and typed prefix at column idx of line line_num.
 
+        The table is None outside of known tables, on header lines and
+        outside of cells, where nothing is completed.
+        """
+        context = self._tokenizer.context(line, idx)
 
-    def _skip_to_next_table(self, lines):
-        line_count = len(lines)
+        if context is None:
+            return {'table' : None}
 
-        if line_count > 1:
-            for l in range(0, line_count-1):
-                first_cell_content = str(lines[l][0])
+        table_column, columns, prefix = context
 
-                if first_cell_content.startswith('*'):
-                    first_cell_content = first_cell_content.strip('* ').title()
+        if columns and columns[0].lstrip().startswith('*'):
+            return {'table' : None}
 
-                    if first_cell_content in setting_table_names:
-                        return ('Settings', lines[l+1:])
-                    elif first_cell_content in variable_table_names:
-                        return ('Variables', lines[l+1:])
-                    elif first_cell_content in test_case_table_names:
-                        return ('Test Cases', lines[l+1:])
-                    elif first_cell_content in keyword_table_names:
-                        return ('Keywords', lines[l+1:])
+        return {'table':self._table_at(line_num), 'col':table_column, 'columns':columns, 'prefix':prefix}
 
-        return (None, [])
 
+    def _candidate_indexes(self):
+        """ Candidate indexes of the current symbols, built once per parse """
+        if self._indexes is not None:
+            return self._indexes
 
-    def _word_before_index(self, line, idx):
-        if idx > 0:
-            start_of_word = idx - 1
+        with stats.timer('index_build'):
+            return self._build_candidate_indexes()
 
-            while str(line[start_of_word]).isalnum():
-                if start_of_word == 0:
-                    return line[0:idx]
-                else:
-                    start_of_word = start_of_word - 1
 
-            if start_of_word < (idx - 1):
-                return line[start_of_word + 1:idx]
+    def _build_candidate_indexes(self):
+        # The symbols may be replaced while the indexes are built when the
+        # parser is updated on another thread, only keep current indexes.
+        revision = self.revision
 
-        return None
+        for path in set(self.library_paths.values()):
+            library_catalog.ingest_python_library(path)
 
+        user_keywords = self._merged_records('keyword')
 
-    def _context(self, line, line_num, idx):
-        table_column = line.count('|', 0, idx)
+        # Library keyword indexes are shared between parsers and merged on lookup
+        keywords = [Symbol(alias, LIBRARY) for alias in self.defined_library_aliases]
+        keywords.extend(user_keywords)
+        library_keyword_indexes = [_library_keyword_index(self._catalog_name(lib))
+                                   for lib in sorted(self.imported_libraries)]
+
+        libraries = [c for c in _library_candidates if c.name not in self.imported_libraries]
+        libraries.extend(Symbol(lib, LIBRARY)
+                         for lib in library_catalog.library_names()
+                         if lib not in library_keywords and lib not in self.imported_libraries)
+
+        variables = self._merged_records('variable')
+        defined = set(variable.name for variable in variables)
+        variables.extend(Symbol(variable, VARIABLE) for variable in default_variables if variable not in defined)
+
+        indexes = {
+            'library' : CandidateIndex(libraries),
+            'keyword' : CandidateIndex(keywords),
+            'library_keyword' : library_keyword_indexes,
+            'user_keyword' : CandidateIndex(user_keywords),
+            'tag' : CandidateIndex(self._merged_records('tag')),
+            'variable' : CandidateIndex(variables, key=variable_key),
+        }
+
+        if revision == self.revision:
+            self._indexes = indexes
+
+        return indexes
 
-        if table_column == 0:
-            return {'table' : None}
 
-        return {'table':'unknown', 'col':table_column-1, 'columns':line.split('|')[1:]}
+    def candidates(self, line, line_num, idx, limit=None):
+        """ Candidates at column idx of line, as [{}, list of Symbol].
 
+        The cell text before idx, spaces included, is the query. Candidates
+        are matched against it as a prefix or a subsequence and the best
+        limit of them are returned, all of them without a limit.
+        """
+        with stats.timer('candidates'):
+            result = self._candidates(line, line_num, idx, limit)
 
-    def candidates( self, line, line_num, idx ):
+        stats.count('candidate_requests')
+        stats.count('candidates_returned', len(result[1]))
+        return result
+
+
+    def _candidates( self, line, line_num, idx, limit ):
 
         available_candidates = []
         no_candidates = [{},[]]
@@ -457,69 +956,573 @@ class RobotFrameworkParser():
             if line[idx-1] == '|' or context['table'] == None:
                 return no_candidates
 
-            if line[idx-1] == '.':
-                library_alias = self._word_before_index(line, idx - 1)
+            indexes = self._candidate_indexes()
+            prefix = context['prefix']
+
+            if '.' in prefix:
+                library_alias, _, keyword_prefix = prefix.partition('.')
 
                 if library_alias in self.defined_library_aliases:
                     library_name = self.defined_library_aliases[library_alias]
+                    keywords = _library_keyword_index(self._catalog_name(library_name))
+
+                    if len(keywords) > 0:
+                        return [{}, fuzzy_lookup([keywords], keyword_prefix, limit)]
 
-                    if library_name in library_keywords:
-                        keywords = library_keywords[library_name]
 
-                        if len(keywords) > 0:
-                            for kw in keywords:
-                                available_candidates.append({'name':kw, 'type':'K', 'class':library_name})
+            table = context['table']
+            table_column = context['col']
+            columns = [column.strip() for column in context['columns']]
+
+            if table == 'Settings':
+                available_candidates = self._setting_candidates(indexes, table_column, columns, prefix, limit)
+            elif table == 'Variables':
+                # The first column names the variable being defined
+                if table_column > 0:
+                    available_candidates = fuzzy_lookup([indexes['variable']], _variable_prefix(prefix), limit)
+            else:
+                available_candidates = self._body_candidates(indexes, table, line_num, table_column, columns,
+                                                             prefix, limit)
 
-                            return [{}, available_candidates]
+        return [{}, available_candidates[:limit]]
 
 
-            table_column = context['col']
-            columns = context['columns']
+    def _setting_candidates(self, indexes, table_column, columns, prefix, limit):
+        if table_column == 0:
+            return fuzzy_lookup([_setting_index], prefix, limit)
+
+        setting = columns[0]
+
+        if table_column == 1:
+            if setting == 'Library':
+                return fuzzy_lookup([indexes['library']], prefix, limit)
+            elif setting in keyword_setting_names:
+                return fuzzy_lookup([indexes['keyword']] + indexes['library_keyword'], prefix, limit)
+
+        if setting in tag_setting_names:
+            return fuzzy_lookup([indexes['tag']], prefix, limit)
+
+        return fuzzy_lookup([indexes['variable']], _variable_prefix(prefix), limit)
+
+
+    def _body_candidates(self, indexes, table, line_num, table_column, columns, prefix, limit):
+        """ Candidates in the Test Cases and Keywords tables """
+        # The first column names the test case or keyword being defined
+        if table_column == 0:
+            return []
+
+        keywords = [indexes['keyword']] + indexes['library_keyword']
+
+        if table_column == 1:
+            settings = _test_case_setting_index if table == 'Test Cases' else _keyword_setting_index
+            return fuzzy_lookup([settings] + keywords, prefix, limit)
+
+        # The variables assigned the result of the call come before its
+        # keyword, the cursor may be on yet another variable being assigned
+        step_column = 1
+        while step_column < table_column and is_assignment(columns[step_column]):
+            step_column += 1
+
+        if table_column == step_column and not prefix.startswith(('$', '@', '&')):
+            return fuzzy_lookup(keywords, prefix, limit)
+
+        step = columns[step_column]
+
+        if step in ['[Tags]', 'Set Tags']:
+            return fuzzy_lookup([indexes['tag']], prefix, limit)
+
+        candidates = []
+        if step in ['[Template]', '[Setup]', '[Precondition]', '[Postcondition]', '[Teardown]']:
+            candidates.extend(fuzzy_lookup(keywords, prefix, limit))
+
+        # Variables of the body in scope at the cursor, merged with the suite's
+        variables = [self._local_candidates(line_num), indexes['variable']]
+        candidates.extend(fuzzy_lookup(variables, _variable_prefix(prefix), limit))
+
+        return candidates
+
+
+    def _name_indexes(self):
+        """ (KeywordIndex, VariableIndex) of the current symbols. The keyword
+        index is None when the keywords of an imported library or resource
+        are unknown, calls can not be checked then. """
+        revision = self.revision
+        cached = self._name_index_cache
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+
+        keyword_index = None
+        libraries = {}
+        for library_name in self.imported_libraries:
+            names = _library_keyword_names(self._catalog_name(library_name))
+            if names is None:
+                break
+
+            # Library.Keyword uses the module name of libraries imported by path
+            libraries[os.path.splitext(os.path.basename(library_name))[0]] = names
+        else:
+            if not self.missing_resources:
+                resources = dict((node.filename_, node._own_symbols['keyword']) for node in self._resource_nodes)
+                keyword_index = KeywordIndex(self.defined_keywords, libraries, self.defined_library_aliases,
+                                             resources)
+
+        indexes = (keyword_index, VariableIndex(self.defined_variables))
+        self._name_index_cache = (revision, indexes)
+
+        return indexes
+
+
+    def diagnostics(self):
+        """ Problems in this file as (line, column, length, kind, message).
+
+        Reports keyword calls that do not resolve, variables that are not
+        defined and Resource settings that can not be located, in a single
+        pass over the symbols of the lines. Variables are only checked when
+        no variable files are imported, as their contents are unknown.
+        """
+        cached = self._diagnostics
+        if cached is not None and cached[0] == self.revision:
+            return cached[1]
+
+        revision = self.revision
+
+        with stats.timer('diagnostics'):
+            # Python libraries have to be ingested before their keywords are known
+            self._candidate_indexes()
+            diagnostics = self._find_problems()
+
+        stats.count('diagnostics', len(diagnostics))
+
+        if revision == self.revision:
+            self._diagnostics = (revision, diagnostics)
+
+        return diagnostics
+
+
+    def _find_problems(self):
+        keyword_index, variable_index = self._name_indexes()
+        # Variables may come from files that are not parsed
+        check_variables = not self.variable_files and not self.missing_resources
+
+        lines = self._lines
+        table_starts = set(self._table_starts)
+        diagnostics = []
+
+        def report(line_no, value, kind, message):
+            column = lines[line_no].find(value) if line_no < len(lines) else -1
+            diagnostics.append((line_no, max(column, 0), len(value), kind, message))
+
+        suite_template = None
+        template = None
+        local_names = set()
+        # Whether the last row declared arguments, '...' rows continue it
+        arguments_row = False
+
+        for line_no, contributions in enumerate(self._line_symbols):
+            if line_no in table_starts:
+                local_names = set()
+                template = None
+                if self._table_at(line_no + 1) == 'Test Cases':
+                    template = suite_template
+
+            if not contributions:
+                continue
+
+            continues_arguments, arguments_row = arguments_row, False
+
+            # In the order the line contributed them, so a [Template] setting
+            # checks its own keyword before the rows after it are arguments
+            for kind, value in contributions:
+                if kind in ('test_case', 'keyword'):
+                    # A new body, with the suite template for test cases
+                    local_names = set()
+                    template = suite_template if kind == 'test_case' else None
+                elif kind == 'suite_template':
+                    suite_template = value
+                elif kind == 'template':
+                    template = None if value.upper() == 'NONE' else value
+                elif kind == 'local':
+                    local_names.add(normalize_variable(value))
+                elif kind == 'arguments':
+                    arguments_row = True
+                elif kind == 'continuation':
+                    arguments_row = continues_arguments
+                elif kind == 'call':
+                    if keyword_index is None or template is not None or '${' in value:
+                        continue
+
+                    if not keyword_index.resolves(value):
+                        report(line_no, value, ERROR, "No keyword with name '{0}' found.".format(value))
+                elif kind == 'use':
+                    if arguments_row:
+                        local_names.add(normalize_variable(value))
+                    elif check_variables and not variable_index.defines(value, local_names):
+                        report(line_no, value, WARNING, "Variable '{0}' not found.".format(value))
+                elif kind == 'missing_resource':
+                    if '${' not in value:
+                        report(line_no, value, ERROR, "Resource file '{0}' does not exist.".format(value))
+
+        return diagnostics
+
+
+    def _file_locations(self):
+        """ FileLocations of this file's own symbols, built once per revision """
+        locations = self._locations
+        if locations is not None and locations[0] == self.revision:
+            return locations[1]
+
+        revision = self.revision
+        with stats.timer('location_index'):
+            locations = FileLocations(self._line_symbols)
+
+        self._locations = (revision, locations)
+        return locations
+
+
+    def _body_index(self):
+        """ BodyIndex of the test cases and keywords of this file, built once per revision """
+        bodies = self._bodies
+        if bodies is not None and bodies[0] == self.revision:
+            return bodies[1]
+
+        revision = self.revision
+        bodies = BodyIndex(self._line_symbols, self._table_starts)
+
+        self._bodies = (revision, bodies)
+        return bodies
+
+
+    def _local_candidates(self, line_num):
+        """ Index of the local variables in scope at line line_num, those
+        shadowing a suite variable left out """
+        revision = self.revision
+        locals_in_scope = self._body_index().locals_at(line_num)
+
+        key = (revision, self._body_index().body_at(line_num), len(locals_in_scope))
+        cached = self._local_index
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        seen = set()
+        symbols = []
+        for line_no, variable in locals_in_scope:
+            name = normalize_variable(variable)
+            if name not in seen and variable not in self.defined_variables:
+                seen.add(name)
+                symbols.append(Symbol(variable, VARIABLE, self.filename_, line_no))
+
+        index = CandidateIndex(symbols, key=variable_key)
+        self._local_index = (key, index)
+
+        return index
+
+
+    def _column(self, line_no, value):
+        """ Column of value on line line_no, 0 when the lines are not kept,
+        as for resources restored from the index """
+        if line_no >= len(self._lines):
+            return 0
+
+        return max(self._lines[line_no].find(value), 0)
+
+
+    def symbol_at(self, line_num, idx):
+        """ (kind, name) of the symbol at column idx of line line_num, None
+        if there is none. kind is 'keyword', 'test_case', 'variable' or
+        'resource', whose name is the path of the resource file. """
+        if line_num >= len(self._lines) or self._tokenizer is None:
+            return None
+
+        contributions = self._line_symbols[line_num] or []
+
+        for position, (start, end, text) in enumerate(self._tokenizer.spans(self._lines[line_num])):
+            if not start <= idx <= end:
+                continue
+
+            for variable_start, variable_end, variable in variable_spans(text):
+                if start + variable_start <= idx < start + variable_end:
+                    return ('variable', variable)
+
+            for kind, value in contributions:
+                if value == text and kind in ('call', 'keyword', 'test_case'):
+                    return ('test_case' if kind == 'test_case' else 'keyword', value)
+
+            if position == 1:
+                for kind, value in contributions:
+                    if kind == 'resource':
+                        return ('resource', value)
+
+            return None
+
+        return None
+
+
+    def definition(self, line_num, idx):
+        """ (path, line, column) defining the symbol at column idx of line
+        line_num, from this file or its resources. None if it is not found,
+        library keywords have no definition to go to. """
+        symbol = self.symbol_at(line_num, idx)
+        if symbol is None:
+            return None
+
+        kind, name = symbol
+        if kind == 'resource':
+            return (name, 0, 0)
+
+        if kind == 'variable':
+            found = self._body_index().local_definition(line_num, name)
+            if found is not None:
+                return (self.filename_, found[0], self._column(found[0], found[1]))
+
+        for parser in [self] + self._resource_nodes:
+            found = parser._file_locations().definition(kind, name)
+            if found is not None:
+                return (parser.filename_, found[0], parser._column(found[0], found[1]))
+
+        return None
+
+
+    def references(self, line_num, idx):
+        """ (path, line, column) of every call of the keyword or use of the
+        variable at column idx of line line_num, in this file and its resources """
+        symbol = self.symbol_at(line_num, idx)
+        if symbol is None or symbol[0] not in ('keyword', 'variable'):
+            return []
+
+        kind, name = symbol
+        if kind == 'keyword':
+            # Calls name the keyword as it is defined, e.g. with embedded arguments
+            for parser in [self] + self._resource_nodes:
+                found = parser._file_locations().definition(kind, name)
+                if found is not None:
+                    name = found[1]
+                    break
+
+        elif self._body_index().local_definition(line_num, name) is not None:
+            # A local variable is only used in its own body
+            bodies = self._body_index()
+            body = bodies.body_at(line_num)
+            return [(self.filename_, line_no, self._column(line_no, value))
+                    for line_no, value in self._file_locations().uses(kind, name)
+                    if bodies.starts[body] <= line_no <= bodies.ends[body]]
+
+        references = []
+        for parser in [self] + self._resource_nodes:
+            references.extend((parser.filename_, line_no, parser._column(line_no, value))
+                              for line_no, value in parser._file_locations().uses(kind, name))
+
+        return references
+
+
+    def documentation(self, line_num, idx):
+        """ Signature and documentation of the keyword at column idx of line
+        line_num, from its [Arguments] and [Documentation] or from the library
+        catalog. None if it is not a known keyword. """
+        symbol = self.symbol_at(line_num, idx)
+        if symbol is None or symbol[0] != 'keyword':
+            return None
+
+        name = symbol[1]
+        for parser in [self] + self._resource_nodes:
+            doc = parser._file_locations().doc(name)
+            if doc is not None:
+                arguments, documentation = doc
+                return _format_documentation(parser._file_locations().definition('keyword', name)[1],
+                                             arguments, documentation)
+
+        call = strip_bdd_prefix(name)
+        qualifier, _, keyword = call.rpartition('.')
+        aliases = self.defined_library_aliases
+
+        for library_name in sorted(self.imported_libraries):
+            names = _library_keyword_names(self._catalog_name(library_name))
+            if not names:
+                continue
+
+            if normalize_name(call) in names:
+                keyword_name = names[normalize_name(call)]
+            elif qualifier and normalize_name(keyword) in names and \
+                    (aliases.get(qualifier) == library_name or
+                     normalize_name(qualifier) == normalize_name(os.path.splitext(os.path.basename(library_name))[0])):
+                keyword_name = names[normalize_name(keyword)]
+            else:
+                continue
+
+            info = library_catalog.keyword_info(self._catalog_name(library_name), keyword_name)
+            arguments, documentation = info if info is not None else ([], '')
+            return _format_documentation(keyword_name, arguments, documentation, library_name)
+
+        return None
+
+
+def statistics():
+    """ Timers and counters of the parsing done in this process """
+    report = stats.report()
+    report['counters'].update({
+        'resource_cache_hits' : resource_cache.hits,
+        'resource_cache_misses' : resource_cache.misses,
+        'resource_cache_entries' : len(resource_cache),
+        'resolver_hits' : resource_resolver.hits,
+        'resolver_misses' : resource_resolver.misses,
+    })
+
+    return report
+
+
+def _parse_resource(path, contents):
+    return RobotFrameworkParser(path, contents, is_resource=True)
+
+
+def _parse_resource_in_process_pool(path, contents):
+    return _resource_process_pool.apply(_parse_resource, (path, contents))
+
+
+def _load_resource(path):
+    """ Parser of the resource at path through the resource cache, None on errors """
+    factory = _parse_resource_in_process_pool if _resource_process_pool else _parse_resource
+
+    try:
+        return resource_cache.get(path, factory)
+    except Exception as e:
+        _logger.error('An exception was thrown when attempting to parse {0}: {1}'.format(path, e))
+        return None
+
+
+def _load_resources(paths, cancelled=None):
+    """ Load the resource tree below paths with the resource thread pool.
+
+    The tree is walked breadth first: all files of one level are read and
+    parsed concurrently, and the resources they import form the next level.
+    Returns a dict of path -> parser (None for files that failed).
+    """
+    loaded = {}
+    level = _unique(paths)
+
+    while level:
+        if cancelled and cancelled():
+            raise ParseCancelled()
+
+        next_level = []
+        for path, parser in zip(level, _resource_thread_pool.map(_load_resource, level)):
+            loaded[path] = parser
+
+            if parser:
+                next_level.extend(parser.resource_paths)
+
+        level = [path for path in _unique(next_level) if path not in loaded]
+
+    return loaded
+
+
+def _unique(paths):
+    seen = set()
+    return [path for path in paths if not (path in seen or seen.add(path))]
+
+
+def configure_resource_loading(threads=0, processes=0):
+    """ Load resource trees with a pool of threads and optionally parse the
+    files in a pool of processes. Zero threads loads resources one by one. """
+    global _resource_thread_pool, _resource_process_pool
+
+    # Imported here, multiprocessing is slow to import and rarely configured
+    import multiprocessing
+    from multiprocessing.pool import ThreadPool
+
+    for pool in (_resource_thread_pool, _resource_process_pool):
+        if pool:
+            pool.close()
+
+    _resource_thread_pool = ThreadPool(threads) if threads > 1 else None
+    _resource_process_pool = multiprocessing.Pool(processes) if threads > 1 and processes > 1 else None
+
+
+def load_resource_index(path):
+    """ Fill the resource cache from the index file at path, returns the number of resources """
+    with stats.timer('index_load'):
+        loaded = resource_cache.load(path, _restore_resource)
+
+    stats.count('index_resources_loaded', loaded)
+    return loaded
+
+
+def save_resource_index(path):
+    """ Save the resource cache to the index file at path if it changed since the last save """
+    if not resource_cache.dirty:
+        return
+
+    with stats.timer('index_save'):
+        resource_cache.save(path, _resource_state)
+
+
+def _resource_state(parser):
+    return parser.state()
+
+
+def _restore_resource(path, state):
+    return RobotFrameworkParser(path, None, is_resource=True, state=state)
+
+
+def _table_name(header):
+    """ Canonical name of the table started by a header cell, None if unknown """
+    header = header.strip('* ').title()
+
+    if header in setting_table_names:
+        return 'Settings'
+    elif header in variable_table_names:
+        return 'Variables'
+    elif header in test_case_table_names:
+        return 'Test Cases'
+    elif header in keyword_table_names:
+        return 'Keywords'
+
+    return None
+
+
+_CURDIR = re.compile(r'\$\{CURDIR\}', re.IGNORECASE)
+
+
+def _expand_curdir(name, filename):
+    """ name with ${CURDIR} replaced by the directory of filename """
+    if '${' not in name:
+        return name
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    expanded = _CURDIR.sub(lambda match: directory, name)
+    return os.path.normpath(expanded) if expanded != name else name
 
-            # TODO: This should check that we are in the settings table ...
-            if table_column == 0:
-                for setting in setting_table_settings:
-                    available_candidates.append({'name':setting, 'type':'S', 'class':'Setting'})
 
+def _variable_prefix(text):
+    """ The part of a cell that is completed as a variable name """
+    start = max(text.rfind(sigil + '{') for sigil in '$@&%')
+    if start >= 0:
+        text = text[start:]
 
-            elif table_column == 1:
-                if columns[0].strip() == 'Library':
-                    # TODO: Check that we are in a settings table
-                    for lib in library_names:
-                        if lib not in self.imported_libraries:
-                            available_candidates.append({'name':lib, 'type':'L', 'class':'Library'})
-                else:
-                    # TODO: Check that we are in a test case table
-                    for tcs in test_case_settings:
-                        available_candidates.append({'name':'[{0}]'.format(tcs), 'type':'S', 'class':'Test Case Setting'})
+    return strip_variable_decoration(text)
 
-                    for alias, _ in self.defined_library_aliases.iteritems():
-                        available_candidates.append({'name':alias, 'type':'L', 'class':'Library'})
 
-                    for lib in self.imported_libraries:
-                        if lib in library_keywords:
-                            keywords = library_keywords[lib]
-                            for kw in keywords:
-                                available_candidates.append({'name':kw, 'type':'K', 'class':lib})
+def _format_documentation(name, arguments, documentation, library_name=None):
+    arguments = [argument for argument in arguments if argument]
+    signature = '{0}({1})'.format(name, ', '.join(arguments)) if arguments else name
+    if library_name:
+        signature = '{0}.{1}'.format(library_name, signature)
 
-                    for kw in self.defined_keywords:
-                        available_candidates.append({'name':kw, 'type':'k', 'class':'user defined'})
+    return signature + '\n\n' + documentation if documentation else signature
 
 
-            elif table_column > 1:
-                if columns[1].strip() in ['[Tags]', 'Set Tags']:
-                    for tag in self.defined_tags:
-                        available_candidates.append({'name':tag, 'type':'T', 'class':'Tag'})
-                    return [{}, available_candidates]
+def _code_cells(cells):
+    """ cells up to a comment, without trailing empty cells """
+    cells = [str(cell).strip() for cell in cells]
 
+    for position, cell in enumerate(cells):
+        if cell.startswith('#'):
+            cells = cells[:position]
+            break
 
-                if columns[1].strip() in ['[Template]', '[Setup]', '[Precondition]', '[Postcondition]', '[Teardown]']:
-                    for kw in self.defined_keywords:
-                        available_candidates.append({'name':kw, 'type':'k', 'class':'user defined'})
+    while cells and not cells[-1]:
+        cells.pop()
 
-                for variable in self.defined_variables:
-                    available_candidates.append({'name':variable, 'type':'V', 'class':'Variable'})
+    return cells
 
-        
-        return [{}, available_candidates]
 
+def _empty_symbol_counters():
+    return dict((kind, collections.Counter()) for kind in symbol_kinds)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+import logging
+import os
+import threading
+import time
+
+from robotfw_stats import stats
+
+
+_logger = logging.getLogger(__name__)
+
+
+# Extensions of the files indexed as possible resources
+RESOURCE_EXTENSIONS = ('.robot', '.txt', '.tsv', '.resource')
+
+
+class ResourceResolver():
+    """ Resolves Resource settings to files.
+
+    A resource is looked for relative to the directory of the importing file
+    and then each of its ancestors. Results, including failed lookups, are
+    cached per (resource, importing directory). A cached result stays valid
+    while the directories it was probed in keep their mtime; every directory
+    is stat'ed at most once per parse pass, however many imports share it.
+
+    With a workspace index the probes under the workspace root are answered
+    from the set of resource files found there instead of the file system.
+    """
+
+    def __init__(self):
+        # (resource, directory) -> (path or None, [(directory, mtime)])
+        self._resolved = {}
+        # directory -> mtime, for the current pass
+        self._dir_mtimes = {}
+        self._lock = threading.Lock()
+
+        self._index = None
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def begin_pass(self):
+        """ Start a new parse pass, directories are stat'ed again """
+        with self._lock:
+            self._dir_mtimes = {}
+
+
+    def set_workspace_root(self, root):
+        """ Index the resource files under root, None disables the index """
+        self._index = ResourceIndex(root) if root else None
+        self.clear()
+
+
+    def clear(self):
+        with self._lock:
+            self._resolved.clear()
+            self._dir_mtimes = {}
+
+
+    def resolve(self, resource, filename):
+        """ Absolute path of resource imported from filename, None if not found """
+        with stats.timer('resolve'):
+            return self._resolve(resource, filename)
+
+
+    def _resolve(self, resource, filename):
+        if self._index:
+            return self._index.resolve(resource, filename, self._mtime)
+
+        key = (resource, os.path.dirname(filename))
+
+        cached = self._resolved.get(key)
+        if cached is not None:
+            path, validators = cached
+            if all(self._mtime(directory) == mtime for directory, mtime in validators):
+                self.hits += 1
+                return path
+
+        self.misses += 1
+
+        path = None
+        validators = []
+
+        for probe in _probe_paths(resource, filename):
+            directory = _existing_parent(probe)
+            validators.append((directory, self._mtime(directory)))
+
+            if os.path.isfile(probe):
+                path = os.path.abspath(probe)
+                break
+
+        self._resolved[key] = (path, validators)
+        return path
+
+
+    def _mtime(self, directory):
+        with self._lock:
+            if directory in self._dir_mtimes:
+                return self._dir_mtimes[directory]
+
+        mtime = _mtime(directory)
+
+        with self._lock:
+            self._dir_mtimes[directory] = mtime
+
+        return mtime
+
+
+class ResourceIndex():
+    """ Set of the resource files under a workspace root.
+
+    Probes outside of the root are answered from the file system. A failed
+    lookup probes the file system once, in case the file was created since
+    the scan, and is then cached while the directories it was probed in keep
+    their mtime.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._files = frozenset()
+        # (resource, directory) -> [(directory, mtime)] of failed lookups
+        self._missing = {}
+
+        self.refresh()
+
+
+    def __len__(self):
+        return len(self._files)
+
+
+    def refresh(self):
+        started = time.time()
+        files = set()
+
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for filename in filenames:
+                if filename.lower().endswith(RESOURCE_EXTENSIONS):
+                    files.add(os.path.join(directory, filename))
+
+        self._files = frozenset(files)
+        self._missing = {}
+
+        _logger.info('Indexed {0} resource files under {1} in {2:.3f}s'.format(
+            len(files), self.root, time.time() - started))
+
+
+    def resolve(self, resource, filename, mtime=None):
+        """ Absolute path of resource imported from filename, None if not found.
+        mtime(directory) returns the mtime of a directory, os.stat by default """
+        path = self._lookup(resource, filename)
+
+        # An import still containing a variable can not be found on disk either
+        if path is not None or '${' in resource:
+            return path
+
+        mtime = mtime or _mtime
+        key = (resource, os.path.dirname(filename))
+
+        cached = self._missing.get(key)
+        if cached is not None and all(mtime(directory) == when for directory, when in cached):
+            return None
+
+        # The file may have been created since the scan
+        validators = []
+        for probe in self._indexed_probes(resource, filename):
+            directory = _existing_parent(probe)
+            validators.append((directory, mtime(directory)))
+
+            if os.path.isfile(probe):
+                self._files = self._files | frozenset([probe])
+                self._missing.pop(key, None)
+                return probe
+
+        self._missing[key] = validators
+        return None
+
+
+    def _lookup(self, resource, filename):
+        for probe in _probe_paths(resource, filename):
+            probe = os.path.abspath(probe)
+            if self._indexes(probe):
+                if probe in self._files:
+                    return probe
+            elif os.path.isfile(probe):
+                # Files outside the workspace are not indexed, look for them on disk
+                return probe
+
+        return None
+
+
+    def _indexed_probes(self, resource, filename):
+        for probe in _probe_paths(resource, filename):
+            probe = os.path.abspath(probe)
+            if self._indexes(probe):
+                yield probe
+
+
+    def _indexes(self, path):
+        """ Whether path is under the workspace root """
+        return path.startswith(self.root + os.sep)
+
+
+def _probe_paths(resource, filename):
+    """ Candidate paths of resource, from the importing file's directory upwards """
+    if os.path.isabs(resource):
+        yield resource
+        return
+
+    resource_dirs = resource.split(os.sep)
+    while resource_dirs and resource_dirs[0] == '..':
+        resource_dirs = resource_dirs[1:]
+
+    parent_dirs = filename.split(os.sep)[0:-1]
+    resource_path = str(os.sep).join(resource_dirs)
+
+    while parent_dirs:
+        yield str(os.sep).join(parent_dirs) + os.sep + resource_path
+        parent_dirs = parent_dirs[0:-1]
+
+
+def _mtime(directory):
+    try:
+        return os.stat(directory).st_mtime
+    except OSError:
+        return None
+
+
+def _existing_parent(path):
+    """ The closest existing directory containing path """
+    directory = os.path.dirname(path) or os.sep
+    while not os.path.isdir(directory):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+
+    return directory
+
+
+resource_resolver = ResourceResolver()
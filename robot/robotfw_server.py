@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""
+Long lived Robot Framework parser process.
+
+The completer starts this script and talks to it over stdin/stdout, one JSON
+object per line. Requests carry an 'id' and a 'command'; every request except
+'parse' is answered with {'id': ..., 'result': ...} or {'id': ..., 'error': ...}.
+
+  parse       filepath, contents,    queue the buffer for parsing, no reply.
+              wait (optional)        With wait, waits up to that many seconds
+                                     for the parse and replies with the
+                                     diagnostics of the last finished parse,
+                                     as [line, column, length, kind, message]
+                                     rows, or None. The other requests are
+                                     answered meanwhile
+  candidates  filepath, line,        candidates from the last finished parse,
+              line_num, column,      as [name, kind, source, line] rows, the
+              limit (optional)       best limit of them
+  definition  filepath, line_num,    [path, line, column] defining the symbol
+              column                 at the position, or None
+  references  filepath, line_num,    [path, line, column] rows of the calls of
+              column                 the keyword or uses of the variable there
+  doc         filepath, line_num,    signature and documentation of the
+              column                 keyword there, or None
+  graph                              summary of the resource graph
+  stats                              phase timers and counters of the server
+  ping                               replies 'pong'
+  shutdown                           saves the resource index, replies and exits
+
+Parsing happens on a ParseWorker thread so candidate queries are answered
+right away from the last completed parse of the file, while a newer buffer of
+the same file supersedes one that is still waiting or being parsed.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+
+from robotfw_catalog import configure_library_catalog
+from robotfw_graph import resource_graph
+from robotfw_parser import configure_resource_loading
+from robotfw_resolver import resource_resolver
+from robotfw_worker import DEFAULT_MAX_PARSERS, ParseWorker
+
+
+_logger = logging.getLogger(__name__)
+
+
+class RobotFrameworkServer():
+
+    def __init__(self, output, index_path=None, watch_resources=False, max_parsers=DEFAULT_MAX_PARSERS):
+        self._output = output
+        self._output_lock = threading.Lock()
+
+        self._worker = ParseWorker(index_path, watch_resources, max_parsers)
+
+
+    def serve(self, requests):
+        for line in iter(requests.readline, ''):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                _logger.error('Malformed request {0!r}: {1}'.format(line, e))
+                continue
+
+            if not self.handle(request):
+                break
+
+        self.stop()
+
+
+    def handle(self, request):
+        """ Handle a single request, returns False once the server should exit """
+        request_id = request.get('id')
+        command = request.get('command')
+
+        try:
+            if command == 'parse':
+                generation = self.parse(request['filepath'], request['contents'])
+                if request.get('wait') is not None:
+                    # Waiting here would hold up the queries behind the parse
+                    self._reply_later(request_id, self.diagnostics, request['filepath'],
+                                      generation, request['wait'])
+            elif command == 'candidates':
+                self._reply(request_id, self.candidates(request['filepath'],
+                                                        request['line'],
+                                                        request['line_num'],
+                                                        request['column'],
+                                                        request.get('limit')))
+            elif command in ('definition', 'references', 'doc'):
+                self._reply(request_id, self.navigate(command,
+                                                      request['filepath'],
+                                                      request['line_num'],
+                                                      request['column']))
+            elif command == 'graph':
+                self._reply(request_id, resource_graph.describe())
+            elif command == 'stats':
+                self._reply(request_id, self._worker.statistics())
+            elif command == 'ping':
+                self._reply(request_id, 'pong')
+            elif command == 'shutdown':
+                # The completer terminates the server once it has the reply,
+                # so the resource index is saved first
+                self.stop()
+                self._reply(request_id, True)
+                return False
+            else:
+                self._reply(request_id, error='Unknown command {0}'.format(command))
+        except Exception as e:
+            _logger.exception('Request {0} failed'.format(command))
+            self._reply(request_id, error=str(e))
+
+        return True
+
+
+    def parse(self, filepath, contents):
+        """ Queue contents for parsing, returns the generation of the parse """
+        return self._worker.submit(filepath, _to_bytes(contents))
+
+
+    def diagnostics(self, filepath, generation, wait):
+        """ Diagnostics of filepath once the parse of generation finished,
+        or of the last finished parse after wait seconds """
+        self._worker.wait(filepath, generation, wait)
+
+        parser = self._worker.parser(filepath)
+        if parser is None:
+            return None
+
+        return [list(diagnostic) for diagnostic in parser.diagnostics()]
+
+
+    def navigate(self, command, filepath, line_num, column):
+        parser = self._worker.parser(filepath)
+        if parser is None:
+            return [] if command == 'references' else None
+
+        if command == 'definition':
+            return parser.definition(line_num, column)
+        elif command == 'references':
+            return parser.references(line_num, column)
+
+        return parser.documentation(line_num, column)
+
+
+    def candidates(self, filepath, line, line_num, column, limit=None):
+        parser = self._worker.parser(filepath)
+        if parser is None:
+            return [{}, []]
+
+        extra, candidates = parser.candidates(_to_bytes(line), line_num, column, limit)
+        return [extra, [candidate.to_row() for candidate in candidates]]
+
+
+    def stop(self):
+        self._worker.stop()
+
+
+    def _reply_later(self, request_id, function, *args):
+        """ Reply with the result of function(*args), called on a thread of its own """
+        def run():
+            try:
+                self._reply(request_id, function(*args))
+            except Exception as e:
+                _logger.exception('Request {0} failed'.format(request_id))
+                self._reply(request_id, error=str(e))
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+
+    def _reply(self, request_id, result=None, error=None):
+        response = {'id': request_id}
+        if error is None:
+            response['result'] = result
+        else:
+            response['error'] = error
+
+        with self._output_lock:
+            self._output.write(json.dumps(response) + '\n')
+            self._output.flush()
+
+
+def _to_bytes(text):
+    # The parser works on UTF-8 encoded byte strings, like the buffers ycmd hands the completer
+    if not isinstance(text, str):
+        text = text.encode('utf-8')
+
+    return text
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Robot Framework parser server')
+    arg_parser.add_argument('--resource-threads', type=int, default=0,
+                            help='threads loading resource files in parallel')
+    arg_parser.add_argument('--resource-processes', type=int, default=0,
+                            help='processes parsing resource files in parallel')
+    arg_parser.add_argument('--workspace-root',
+                            help='index the resource files under this directory')
+    arg_parser.add_argument('--library-catalog',
+                            help='sqlite file the library keyword catalog is kept in')
+    arg_parser.add_argument('--libdoc-dir', action='append', default=[],
+                            help='directory of libdoc spec files to catalog, may be repeated')
+    arg_parser.add_argument('--index-file',
+                            help='file the parsed resources are kept in between runs')
+    arg_parser.add_argument('--watch-resources', action='store_true',
+                            help='refresh parsed resources when their files change')
+    arg_parser.add_argument('--max-parsers', type=int, default=DEFAULT_MAX_PARSERS,
+                            help='parsers of open files kept, least recently used first dropped')
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+
+    configure_resource_loading(args.resource_threads, args.resource_processes)
+    resource_resolver.set_workspace_root(args.workspace_root)
+    configure_library_catalog(args.library_catalog, args.libdoc_dir)
+
+    server = RobotFrameworkServer(sys.stdout, args.index_file, args.watch_resources, args.max_parsers)
+    server.serve(sys.stdin)
+
+
+if __name__ == '__main__':
+    main()
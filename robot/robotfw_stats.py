@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+
+class Stats():
+    """ Phase timers and counters of this process, aggregated in memory.
+
+    A timer accumulates the number of times a phase ran, its total and its
+    longest duration. Recording takes a lock and a few additions, so phases
+    are timed around whole steps (a chunk of lines, a resource file), never
+    per line.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+
+    def reset(self):
+        with self._lock:
+            # phase -> [count, total seconds, max seconds]
+            self._timers = {}
+            self._counters = {}
+            self._started = time.time()
+
+
+    def timer(self, phase):
+        """ Context manager timing one run of phase """
+        return _Timer(self, phase)
+
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            timer = self._timers.get(phase)
+            if timer is None:
+                self._timers[phase] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+
+    def count(self, counter, n=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + n
+
+
+    def report(self):
+        """ The timers and counters as a JSON serializable dict """
+        with self._lock:
+            timers = dict((phase, {
+                'count' : count,
+                'total_ms' : total * 1000,
+                'mean_ms' : total * 1000 / count,
+                'max_ms' : longest * 1000,
+            }) for phase, (count, total, longest) in self._timers.items())
+
+            return {
+                'uptime_s' : time.time() - self._started,
+                'timers' : timers,
+                'counters' : dict(self._counters),
+            }
+
+
+class _Timer():
+
+    def __init__(self, stats, phase):
+        self._stats = stats
+        self._phase = phase
+
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self._stats.add_time(self._phase, time.time() - self._start)
+        return False
+
+
+stats = Stats()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import sys
+
+
+# Kind codes of completion candidates
+SETTING = 0
+TEST_CASE_SETTING = 1
+LIBRARY = 2
+LIBRARY_KEYWORD = 3
+USER_KEYWORD = 4
+TAG = 5
+VARIABLE = 6
+TEST_CASE = 7
+KEYWORD_SETTING = 8
+
+# Kind code -> (type, class) shown in the completion menu. Library keywords
+# show the library they come from, which is their source.
+_KIND_LABELS = [
+    ('S', 'Setting'),
+    ('S', 'Test Case Setting'),
+    ('L', 'Library'),
+    ('K', None),
+    ('k', 'user defined'),
+    ('T', 'Tag'),
+    ('V', 'Variable'),
+    ('t', 'Test Case'),
+    ('S', 'Keyword Setting'),
+]
+
+# Parser symbol kind -> kind code of its records
+parser_kinds = {
+    'keyword' : USER_KEYWORD,
+    'test_case' : TEST_CASE,
+    'tag' : TAG,
+    'variable' : VARIABLE,
+}
+
+_intern = getattr(sys, 'intern', None) or intern
+
+
+def intern_name(value):
+    """ The interned copy of a name, so equal names across files share one string """
+    # Python 2 only interns byte strings
+    if type(value) is str:
+        return _intern(value)
+
+    return value
+
+
+class Symbol(object):
+    """ A completion candidate.
+
+    source is the file defining the symbol, or the library of a library
+    keyword, and line its 0-based line in that file. Records are shared by
+    all indexes and completion requests and must not be modified.
+    """
+
+    __slots__ = ('name', 'kind', 'source', 'line')
+
+    def __init__(self, name, kind, source=None, line=None):
+        self.name = intern_name(name)
+        self.kind = kind
+        self.source = source
+        self.line = line
+
+
+    def __repr__(self):
+        return 'Symbol({0!r}, {1}, {2!r}, {3!r})'.format(self.name, self.kind, self.source, self.line)
+
+
+    @property
+    def type(self):
+        return _KIND_LABELS[self.kind][0]
+
+
+    @property
+    def label(self):
+        return _KIND_LABELS[self.kind][1] or self.source
+
+
+    def to_row(self):
+        """ Compact JSON form, a list of the slots """
+        return [self.name, self.kind, self.source, self.line]
+
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+import os
+import re
+
+
+# A space separated cell: words joined by single spaces
+_SPACE_CELL = re.compile(r'[^ \t]+(?: [^ \t]+)*')
+
+
+class PipeTokenizer():
+    """ Pipe separated format, '| Cell | Cell |'.
+
+    Cells are the text between the first and the last pipe of a line; lines
+    with fewer than two pipes have no cells.
+    """
+
+    format = 'pipe'
+
+    def cells(self, line):
+        """ Stripped cells of line, None if it has none """
+        if line:
+            parts = line.split('|')
+            if len(parts) > 2:
+                parts = parts[1:-1]
+                for p in range(0, len(parts)):
+                    parts[p] = parts[p].strip()
+                return parts
+
+        return None
+
+
+    def iter_cells(self, lines):
+        """ Yield (line number, cells) for every line that has cells """
+        cells = self.cells
+        for line_no, line in enumerate(lines):
+            line_cells = cells(line)
+            if line_cells is not None:
+                yield (line_no, line_cells)
+
+
+    def spans(self, line):
+        """ (start, end, text) of every cell of line, in a single pass """
+        spans = []
+        start = line.find('|')
+        if start < 0:
+            return spans
+
+        while True:
+            end = line.find('|', start + 1)
+            if end < 0:
+                break
+
+            text = line[start + 1:end]
+            stripped = text.strip()
+            offset = start + 1 + len(text) - len(text.lstrip())
+            spans.append((offset, offset + len(stripped), stripped))
+            start = end
+
+        return spans
+
+
+    def context(self, line, idx):
+        """ (column, cells, prefix) of the cell idx is in, None outside of cells """
+        table_column = line.count('|', 0, idx)
+
+        if table_column == 0:
+            return None
+
+        prefix = line[line.rfind('|', 0, idx) + 1:idx].lstrip()
+
+        return (table_column - 1, line.split('|')[1:], prefix)
+
+
+class SeparatedTokenizer(PipeTokenizer):
+    """ Formats where whitespace separates the cells.
+
+    Subclasses provide _spans(line). A line starting with a separator has an
+    empty first cell, as the rows of test cases and keywords do; comment
+    lines have no cells. Lines starting with a pipe are pipe separated, as
+    Robot Framework allows mixing the formats line by line.
+    """
+
+    def cells(self, line):
+        if line[:1] == '|':
+            return PipeTokenizer.cells(self, line)
+
+        if not line or line[:1] == '#':
+            return None
+
+        cells = [text for _, _, text in self._spans(line)]
+        if not cells or not any(cells):
+            return None
+
+        return cells
+
+
+    def spans(self, line):
+        if line[:1] == '|':
+            return PipeTokenizer.spans(self, line)
+
+        return self._spans(line)
+
+
+    def context(self, line, idx):
+        if line[:1] == '|':
+            return PipeTokenizer.context(self, line, idx)
+
+        spans = self._spans(line)
+        cells = [text for _, _, text in spans]
+
+        column = 0
+        last = None
+        for start, end, _ in spans:
+            if start > idx:
+                break
+
+            if idx <= end:
+                return (column, cells, line[start:idx])
+
+            last = (start, end)
+            column += 1
+
+        # The cursor is between cells, it either continues the last cell or
+        # starts a new one after a full separator
+        if last is not None and not self._is_separator(line[last[1]:idx]):
+            return (column - 1, cells, line[last[0]:idx])
+
+        return (column, cells, '')
+
+
+class SpaceTokenizer(SeparatedTokenizer):
+    """ Space separated format, cells are separated by two or more spaces or a tab """
+
+    format = 'space'
+
+    def cells(self, line):
+        # Same cells as the spans give, without building the spans
+        if not line or line[:1] in '|#':
+            return SeparatedTokenizer.cells(self, line)
+
+        cells = _SPACE_CELL.findall(line)
+        if not cells:
+            return None
+
+        if line[:1] == '\t' or line[:2] == '  ':
+            cells.insert(0, '')
+
+        return cells
+
+
+    def _spans(self, line):
+        spans = []
+        if line[:1] == '\t' or line[:2] == '  ':
+            spans.append((0, 0, ''))
+
+        for match in _SPACE_CELL.finditer(line):
+            spans.append((match.start(), match.end(), match.group()))
+
+        return spans
+
+
+    def _is_separator(self, text):
+        return '\t' in text or '  ' in text
+
+
+class TsvTokenizer(SeparatedTokenizer):
+    """ Tab separated format, optionally with quoted cells """
+
+    format = 'tsv'
+
+    def _spans(self, line):
+        spans = []
+        start = 0
+
+        for part in line.split('\t'):
+            text = part.strip()
+            offset = start + len(part) - len(part.lstrip())
+
+            if len(text) > 1 and text[0] == '"' and text[-1] == '"':
+                text = text[1:-1].replace('""', '"')
+
+            spans.append((offset, offset + len(part.strip()), text))
+            start += len(part) + 1
+
+        # Trailing empty cells carry no information
+        while spans and not spans[-1][2]:
+            spans.pop()
+
+        return spans
+
+
+    def _is_separator(self, text):
+        return '\t' in text
+
+
+pipe_tokenizer = PipeTokenizer()
+space_tokenizer = SpaceTokenizer()
+tsv_tokenizer = TsvTokenizer()
+
+
+def tokenizer_for(filename, lines):
+    """ Tokenizer of the format of a file, detected from its name and first row """
+    if filename and os.path.splitext(filename)[1].lower() == '.tsv':
+        return tsv_tokenizer
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            return pipe_tokenizer if stripped.startswith('|') else space_tokenizer
+
+    return pipe_tokenizer
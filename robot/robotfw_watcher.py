@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+
+
+_logger = logging.getLogger(__name__)
+
+
+# Seconds between checks of the watched files when inotify is not available
+POLL_INTERVAL = 2.0
+
+# Seconds without further changes before a batch of changes is reported, so
+# that a checkout touching many files is handled once
+SETTLE_TIME = 0.2
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+
+# struct inotify_event without its variable length name
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class ResourceWatcher():
+    """ Reports resource files that changed on disk.
+
+    Watches the directories of the files given to watch() with inotify on
+    Linux, and otherwise stats the files every POLL_INTERVAL seconds. Changes
+    are collected until no more arrive for SETTLE_TIME seconds and then
+    on_change(paths) is called on the watcher thread with the watched files
+    that were written, replaced or deleted.
+    """
+
+    def __init__(self, on_change, use_inotify=True):
+        self._on_change = on_change
+        self._stopped = threading.Event()
+
+        self._backend = None
+        if use_inotify:
+            self._backend = _InotifyBackend.create()
+        if self._backend is None:
+            self._backend = _PollingBackend(self._stopped)
+
+        _logger.info('Watching resources with {0}'.format(self._backend.name))
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    @property
+    def method(self):
+        """ 'inotify' or 'polling' """
+        return self._backend.name
+
+
+    def watched(self):
+        """ Number of watched files """
+        return len(self._backend.files)
+
+
+    def watch(self, paths):
+        """ Watch exactly the files at paths from now on """
+        self._backend.update(frozenset(os.path.abspath(path) for path in paths))
+
+
+    def stop(self):
+        self._stopped.set()
+
+
+    def _run(self):
+        pending = set()
+
+        while not self._stopped.is_set():
+            try:
+                changed = self._backend.changes(SETTLE_TIME if pending else POLL_INTERVAL)
+            except Exception:
+                _logger.exception('Watching resources failed')
+                break
+
+            if changed:
+                pending.update(changed)
+                continue
+
+            if pending:
+                paths, pending = sorted(pending & self._backend.files), set()
+                if paths:
+                    _logger.info('Resources changed on disk: {0}'.format(', '.join(paths)))
+                    try:
+                        self._on_change(paths)
+                    except Exception:
+                        _logger.exception('Refreshing changed resources failed')
+
+        self._backend.close()
+
+
+class _PollingBackend():
+
+    name = 'polling'
+
+    def __init__(self, stopped):
+        self.files = frozenset()
+        self._stopped = stopped
+        # path -> (mtime, size), None for missing files
+        self._signatures = {}
+
+
+    def update(self, files):
+        self._signatures = dict((path, self._signatures[path] if path in self._signatures else _signature(path))
+                                for path in files)
+        self.files = files
+
+
+    def changes(self, timeout):
+        self._stopped.wait(timeout)
+
+        changed = set()
+        for path, signature in list(self._signatures.items()):
+            current = _signature(path)
+            if current != signature:
+                self._signatures[path] = current
+                changed.add(path)
+
+        return changed
+
+
+    def close(self):
+        pass
+
+
+class _InotifyBackend():
+    """ Watches directories with inotify(7), called through ctypes """
+
+    name = 'inotify'
+
+    def __init__(self, libc, fd):
+        self.files = frozenset()
+        self._libc = libc
+        self._fd = fd
+        self._lock = threading.Lock()
+        # directory -> watch descriptor, and back
+        self._watches = {}
+        self._directories = {}
+
+
+    @classmethod
+    def create(cls):
+        """ A backend, None where inotify is not available """
+        if not sys.platform.startswith('linux'):
+            return None
+
+        try:
+            import ctypes
+            import ctypes.util
+
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            _logger.info('inotify is not available: {0}'.format(e))
+            return None
+
+        if fd < 0:
+            _logger.info('inotify_init1 failed: {0}'.format(os.strerror(ctypes.get_errno())))
+            return None
+
+        return cls(libc, fd)
+
+
+    def update(self, files):
+        directories = set(os.path.dirname(path) for path in files)
+
+        with self._lock:
+            for directory in set(self._watches) - directories:
+                self._libc.inotify_rm_watch(self._fd, self._watches.pop(directory))
+
+            for directory in directories - set(self._watches):
+                wd = self._libc.inotify_add_watch(self._fd, _to_bytes(directory), _WATCH_MASK)
+                if wd < 0:
+                    _logger.info('Can not watch {0}'.format(directory))
+                    continue
+
+                self._watches[directory] = wd
+                self._directories[wd] = directory
+
+            self.files = files
+
+
+    def changes(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return set()
+            raise
+
+        changed = set()
+        offset = 0
+
+        with self._lock:
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += _EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost, treat every file as changed
+                    changed.update(self.files)
+                    continue
+
+                directory = self._directories.get(wd)
+                if directory is None:
+                    continue
+
+                if mask & IN_IGNORED:
+                    # The directory was removed or unwatched
+                    del self._directories[wd]
+                    if self._watches.get(directory) == wd:
+                        del self._watches[directory]
+                    changed.update(path for path in self.files if os.path.dirname(path) == directory)
+                elif name:
+                    changed.add(os.path.join(directory, _from_bytes(name)))
+
+        return changed
+
+
+    def close(self):
+        os.close(self._fd)
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    return (st.st_mtime, st.st_size)
+
+
+def _to_bytes(path):
+    if isinstance(path, bytes):
+        return path
+
+    return path.encode(sys.getfilesystemencoding() or 'utf-8')
+
+
+def _from_bytes(name):
+    # Paths are byte strings on Python 2 and text on Python 3, as os returns them
+    if isinstance(name, str):
+        return name
+
+    return name.decode(sys.getfilesystemencoding() or 'utf-8', 'surrogateescape')
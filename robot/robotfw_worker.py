@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+
+import collections
+import logging
+import threading
+import time
+
+from robotfw_parser import ParseCancelled, RobotFrameworkParser, load_resource_index, save_resource_index, statistics
+from robotfw_stats import stats
+from robotfw_watcher import ResourceWatcher
+
+
+_logger = logging.getLogger(__name__)
+
+
+# Least seconds between saves of the resource index after parses
+INDEX_SAVE_INTERVAL = 30
+
+# Parsers of open files kept at most, the least recently used is dropped first
+DEFAULT_MAX_PARSERS = 16
+
+
+class ParseWorker():
+    """ Parses buffers on a background thread.
+
+    Every submitted buffer gets a generation number. Submitting a newer buffer
+    of a file replaces the one still waiting to be parsed and cancels a fresh
+    parse of an older generation that is already running. Readers are served
+    the parser of the last parse that completed, never a partial one.
+
+    A file that already has a parser is updated incrementally on a copy of it,
+    or parsed from scratch when the edit changed its table layout, and the new
+    parser replaces the old one once it is complete. Parsers are kept for the
+    max_parsers files used most recently, and share the parsed resources
+    through the resource cache, so switching between buffers does not parse
+    them again.
+
+    With an index_path the resource cache is loaded from that file before
+    the first parse and saved to it after parses, at most every
+    INDEX_SAVE_INTERVAL seconds, and when the worker stops.
+
+    With watch_resources the resources imported by the parsed files are
+    watched; when some change on disk, refreshed copies of the parsers
+    importing them replace those on the worker thread, after the buffers
+    waiting to be parsed.
+    """
+
+    def __init__(self, index_path=None, watch_resources=False, max_parsers=DEFAULT_MAX_PARSERS):
+        # Generation of the last submitted buffer
+        self.generation = 0
+        # Number of parses that completed
+        self.completed = 0
+        self.cancelled = 0
+        # Number of refreshes after resources changed on disk
+        self.refreshed = 0
+        self.evicted = 0
+
+        # filepath -> parser of the last completed parse, least recently used first
+        self._parsers = collections.OrderedDict()
+        self._max_parsers = max_parsers
+        # filepath -> generation of the last parse that completed or failed
+        self._finished = {}
+
+        # filepath -> (generation, contents) waiting to be parsed
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._running = True
+
+        self._index_path = index_path
+        self._index_saved = time.time()
+
+        # Paths of resources changed on disk, waiting to be refreshed
+        self._changed_resources = set()
+        self._watcher = ResourceWatcher(self._resources_changed) if watch_resources else None
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def submit(self, filepath, contents):
+        """ Queue contents of filepath for parsing, returns its generation """
+        with self._condition:
+            self.generation += 1
+            self._pending[filepath] = (self.generation, contents)
+            self._condition.notify_all()
+
+            return self.generation
+
+
+    def parser(self, filepath):
+        """ Parser of the last completed parse of filepath, None if there is none """
+        with self._condition:
+            parser = self._parsers.pop(filepath, None)
+            if parser is not None:
+                self._parsers[filepath] = parser
+
+            return parser
+
+
+    def wait(self, filepath, generation, timeout=None):
+        """ Wait until filepath has been parsed at generation or later """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self._condition:
+            while self._finished.get(filepath, 0) < generation:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+
+                self._condition.wait(remaining)
+
+            return True
+
+
+    def statistics(self):
+        """ Parse statistics of this process, with the counters of the worker """
+        report = statistics()
+        report['counters'].update({
+            'parses_submitted' : self.generation,
+            'parses_completed' : self.completed,
+            'parses_cancelled' : self.cancelled,
+            'files_open' : len(self._parsers),
+            'resource_refreshes' : self.refreshed,
+            'parsers_evicted' : self.evicted,
+        })
+
+        if self._watcher:
+            report['watcher'] = {
+                'method' : self._watcher.method,
+                'files' : self._watcher.watched(),
+            }
+
+        return report
+
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if self._watcher:
+            self._watcher.stop()
+
+        self._save_index()
+
+
+    def _run(self):
+        if self._index_path:
+            load_resource_index(self._index_path)
+
+        while True:
+            with self._condition:
+                while self._running and not self._pending and not self._changed_resources:
+                    self._condition.wait()
+
+                if not self._running:
+                    return
+
+                changed = None
+                if self._pending:
+                    filepath, (generation, contents) = self._pending.popitem()
+                else:
+                    changed, self._changed_resources = self._changed_resources, set()
+
+            if changed:
+                self._refresh(changed)
+                continue
+
+            try:
+                parser = self._parse(filepath, generation, contents)
+            except ParseCancelled:
+                _logger.info('Parse of {0} superseded by a newer buffer'.format(filepath))
+                self.cancelled += 1
+                continue
+            except Exception:
+                _logger.exception('Parsing {0} failed'.format(filepath))
+                parser = None
+
+            with self._condition:
+                if parser:
+                    self._parsers.pop(filepath, None)
+                    self._parsers[filepath] = parser
+                    self.completed += 1
+
+                    while len(self._parsers) > self._max_parsers:
+                        evicted, _ = self._parsers.popitem(last=False)
+                        _logger.info('Dropping the parser of {0}'.format(evicted))
+                        self.evicted += 1
+
+                self._finished[filepath] = generation
+                self._condition.notify_all()
+
+            self._watch_resources()
+
+            if time.time() - self._index_saved >= INDEX_SAVE_INTERVAL:
+                self._save_index()
+
+
+    def _resources_changed(self, paths):
+        with self._condition:
+            self._changed_resources.update(paths)
+            self._condition.notify_all()
+
+
+    def _refresh(self, paths):
+        """ Refresh the parsers importing the resources at paths, which changed on disk """
+        stats.count('resources_changed', len(paths))
+
+        for filepath, parser in self._open_parsers():
+            try:
+                refreshed = parser.refreshed(paths)
+                if refreshed is parser:
+                    continue
+
+                refreshed._candidate_indexes()
+            except Exception:
+                _logger.exception('Refreshing the resources of {0} failed'.format(filepath))
+                continue
+
+            with self._condition:
+                # Unless a newer parse replaced or evicted it meanwhile
+                if self._parsers.get(filepath) is parser:
+                    self._parsers[filepath] = refreshed
+
+        self.refreshed += 1
+        self._watch_resources()
+
+
+    def _watch_resources(self):
+        if self._watcher:
+            self._watcher.watch(set().union(*[parser.imported_resources for _, parser in self._open_parsers()]))
+
+
+    def _open_parsers(self):
+        # parser() reorders the parsers from other threads
+        with self._condition:
+            return list(self._parsers.items())
+
+
+    def _save_index(self):
+        if not self._index_path:
+            return
+
+        self._index_saved = time.time()
+        try:
+            save_resource_index(self._index_path)
+        except Exception as e:
+            _logger.error('Could not save the resource index to {0}: {1}'.format(self._index_path, e))
+
+
+    def _parse(self, filepath, generation, contents):
+        with self._condition:
+            parser = self._parsers.get(filepath)
+
+        def superseded():
+            pending = self._pending.get(filepath)
+            return (pending is not None and pending[0] > generation) or not self._running
+
+        # Readers keep being served the current parser until the new one is done
+        if parser:
+            parser = parser.updated(contents, cancelled=superseded)
+        else:
+            parser = RobotFrameworkParser(filepath, contents, cancelled=superseded)
+
+        # Build the candidate indexes here rather than on the first query
+        parser._candidate_indexes()
+        return parser
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Completion candidates of the cells of test case and keyword bodies.
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot'))
+
+from robotfw_parser import RobotFrameworkParser
+
+
+SUITE = '''*** Settings ***
+Library    Collections
+
+*** Keywords ***
+Shared Keyword
+    Log    shared
+
+*** Test Cases ***
+Test
+    ${result}=    Shared Keyword
+    Log    ${result}
+'''
+
+
+class BodyCandidatesTest(unittest.TestCase):
+
+    def candidates(self, row):
+        """ Names of the candidates at the end of row, added to the test """
+        contents = SUITE + row + '\n'
+        parser = RobotFrameworkParser('/nonexistent/suite.robot', contents)
+
+        line_num = len(contents.splitlines()) - 1
+        return [candidate.name for candidate in parser.candidates(row, line_num, len(row))[1]]
+
+
+    def test_keyword_after_assignments(self):
+        self.assertIn('Shared Keyword', self.candidates('    ${value}=    Sha'))
+        self.assertIn('Shared Keyword', self.candidates('    ${first}    ${second}    Sha'))
+
+
+    def test_variable_being_assigned(self):
+        self.assertEqual(self.candidates('    ${first}    ${res'), ['${result}'])
+
+
+    def test_keyword_of_body_setting(self):
+        self.assertEqual(self.candidates('    [Setup]    Append To'), ['Append To List'])
+        self.assertIn('Shared Keyword', self.candidates('    [Teardown]    Sha'))
+
+
+if __name__ == '__main__':
+    unittest.main()
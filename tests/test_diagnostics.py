@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Diagnostics of suites: keyword calls that do not resolve, unknown variables
+and missing resources, and the cases where they must not be reported.
+
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot'))
+
+from robotfw_parser import RobotFrameworkParser
+from robotfw_resolver import resource_resolver
+
+
+RESOURCE = '''*** Variables ***
+${SHARED}    shared
+
+*** Keywords ***
+Shared Keyword
+    Log    ${SHARED}
+'''
+
+
+class DiagnosticsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='robotfw-test-')
+        os.mkdir(os.path.join(self.directory, 'resources'))
+        with open(os.path.join(self.directory, 'resources', 'common.robot'), 'w') as f:
+            f.write(RESOURCE)
+
+        resource_resolver.clear()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def diagnostics(self, settings, body):
+        """ (kind, message) of the diagnostics of a suite with settings and
+        a test case running body """
+        contents = '*** Settings ***\n{0}\n\n*** Test Cases ***\nTest\n{1}\n'.format(
+            '\n'.join(settings), '\n'.join('    ' + row for row in body))
+        parser = RobotFrameworkParser(os.path.join(self.directory, 'suite.robot'), contents)
+
+        return [(kind, message) for _, _, _, kind, message in parser.diagnostics()]
+
+
+    def test_unknown_names_are_reported(self):
+        self.assertEqual(self.diagnostics(['Resource    resources/common.robot'],
+                                          ['Shared Keyword', 'Log    ${SHARED}',
+                                           'Unknown Keyword', 'Log    ${UNKNOWN}']),
+                         [('ERROR', "No keyword with name 'Unknown Keyword' found."),
+                          ('WARNING', "Variable '${UNKNOWN}' not found.")])
+
+
+    def test_curdir_resource_is_resolved(self):
+        self.assertEqual(self.diagnostics(['Resource    ${CURDIR}/resources/common.robot'],
+                                          ['Shared Keyword', 'Log    ${SHARED}']),
+                         [])
+
+
+    def test_unresolved_resource_disables_name_checks(self):
+        self.assertEqual(self.diagnostics(['Resource    ${RESOURCES}/common.robot'],
+                                          ['Shared Keyword', 'Log    ${SHARED}']),
+                         [])
+
+
+    def test_missing_resource_is_reported(self):
+        self.assertEqual(self.diagnostics(['Resource    missing.robot'],
+                                          ['Shared Keyword', 'Log    ${SHARED}']),
+                         [('ERROR', "Resource file 'missing.robot' does not exist.")])
+
+
+    def test_var_defines_variables(self):
+        self.assertEqual(self.diagnostics([],
+                                          ['VAR    ${local}    value',
+                                           'VAR    @{items}    a    b    separator=${SPACE}',
+                                           'VAR    ${suite}    value    scope=SUITE',
+                                           'Log Many    ${local}    @{items}    ${suite}']),
+                         [])
+
+
+    def test_library_aliases(self):
+        self.assertEqual(self.diagnostics(['Library    Collections    AS    Col',
+                                           'Library    String    WITH NAME    Str'],
+                                          ['Col.Append To List    ${list}    a',
+                                           'Str.Convert To Upper Case    text',
+                                           'Col.Unknown Keyword']),
+                         [('WARNING', "Variable '${list}' not found."),
+                          ('ERROR', "No keyword with name 'Col.Unknown Keyword' found.")])
+
+
+    def test_python_library_keywords(self):
+        self.write('NamedLib.py', 'from robot.api.deco import keyword\n\n'
+                                  '@keyword(name="Named Keyword")\ndef named():\n    pass\n\n'
+                                  'def plain_keyword():\n    pass\n')
+
+        self.assertEqual(self.diagnostics(['Library    NamedLib.py'],
+                                          ['Named Keyword', 'Plain Keyword', 'Unknown Keyword']),
+                         [('ERROR', "No keyword with name 'Unknown Keyword' found.")])
+
+
+    def test_python_library_with_unknown_keywords(self):
+        self.write('BaseLib.py', 'from base import Base\n\nclass BaseLib(Base):\n    pass\n')
+        self.write('DynamicLib.py', 'class DynamicLib(object):\n'
+                                    '    def get_keyword_names(self):\n        return ["Dynamic Keyword"]\n')
+
+        for library in ('BaseLib.py', 'DynamicLib.py'):
+            self.assertEqual(self.diagnostics(['Library    ' + library], ['Inherited Keyword']), [])
+
+
+    def write(self, filename, contents):
+        with open(os.path.join(self.directory, filename), 'w') as f:
+            f.write(contents)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+"""
+Incremental re-parses must leave the parser as a fresh parse would.
+
+Applies random line edits, including ones that add or remove table headers
+and switch the format, to a suite importing a resource, and compares
+update() and updated() with a new RobotFrameworkParser of the same contents.
+
+    python -m unittest discover tests
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot'))
+
+from robotfw_parser import RobotFrameworkParser
+
+
+RESOURCE = '''*** Variables ***
+${SHARED}    shared
+
+*** Keywords ***
+Shared Keyword
+    [Arguments]    ${arg}
+    Log    ${arg}
+'''
+
+SUITE = '''*** Settings ***
+Library    Collections
+Resource    common.robot
+Documentation    A suite
+...    over two lines
+
+*** Variables ***
+${NAME}    value
+@{ITEMS}    a    b
+
+*** Test Cases ***
+First Test
+    [Documentation]    Does things
+    ${result}=    Shared Keyword    ${NAME}
+    Log    ${result}
+    Set Suite Variable    ${FROM_TEST}    1
+
+Second Test
+    [Template]    Own Keyword
+    ${SHARED}
+    ${UNKNOWN}
+
+*** Keywords ***
+Own Keyword
+    [Arguments]    ${value}
+    FOR    ${item}    IN    @{ITEMS}
+        Log    ${item}    ${value}
+    END
+    Missing Keyword    ${FROM_TEST}
+'''
+
+# Lines inserted or swapped in by the random edits
+LINES = [
+    '',
+    '# comment',
+    '*** Settings ***',
+    '*** Variables ***',
+    '*** Test Cases ***',
+    '*** Keywords ***',
+    'Library    String',
+    'Resource    common.robot',
+    'Resource    missing.robot',
+    '${NEW}    new value',
+    '...    continued',
+    'New Test',
+    'New Keyword',
+    '    [Arguments]    ${first}    ${second}',
+    '    [Documentation]    New documentation',
+    '    Log    ${NEW}',
+    '    ${local}=    Set Variable    1',
+    '    Log    ${local}',
+    '    Set Test Variable    ${TEST_VAR}    1',
+    '    Should Be Equal    ${TEST_VAR}    ${NAME}',
+    '    Own Keyword    ${SHARED}',
+    '    Undefined Keyword',
+    '    Convert To Upper Case    text',
+    '    END',
+    '| Pipe Keyword | Log | x |',
+]
+
+EDITS = 200
+
+
+def snapshot(parser):
+    """ What a parse leaves behind, in comparable form """
+    return {
+        'keywords' : sorted(parser.defined_keywords),
+        'test_cases' : sorted(parser.defined_test_cases),
+        'variables' : sorted(parser.defined_variables),
+        'tags' : sorted(parser.defined_tags),
+        'aliases' : sorted(parser.defined_library_aliases.items()),
+        'resources' : sorted(parser.imported_resources),
+        'libraries' : sorted(parser.imported_libraries),
+        'resource_paths' : parser.resource_paths,
+        'line_symbols' : [list(contributions or []) for contributions in parser._line_symbols],
+        'table_starts' : parser._table_starts,
+        'diagnostics' : parser.diagnostics(),
+    }
+
+
+def edit(rng, lines):
+    """ lines after one random edit """
+    lines = list(lines)
+    action = rng.choice(['replace', 'replace', 'insert', 'delete', 'format'])
+
+    if action == 'format' or not lines:
+        # Switch between the space and the pipe separated format
+        first = next((i for i, line in enumerate(lines) if line.strip()), None)
+        if first is None:
+            return [rng.choice(LINES)]
+        elif lines[first].startswith('|'):
+            lines[first] = lines[first].lstrip('| ')
+        else:
+            lines[first] = '| ' + lines[first]
+        return lines
+
+    line_no = rng.randrange(len(lines))
+    if action == 'replace':
+        lines[line_no] = rng.choice(LINES)
+    elif action == 'insert':
+        lines.insert(line_no, rng.choice(LINES))
+    else:
+        del lines[line_no]
+
+    return lines
+
+
+class ParserUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='robotfw-test-')
+        with open(os.path.join(self.directory, 'common.robot'), 'w') as f:
+            f.write(RESOURCE)
+
+        self.path = os.path.join(self.directory, 'suite.robot')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def check_edits(self, seed, apply):
+        """ Apply EDITS random edits with apply(parser, contents), which
+        returns the updated parser, and compare it with a fresh parse """
+        rng = random.Random(seed)
+        lines = SUITE.splitlines()
+        parser = RobotFrameworkParser(self.path, SUITE)
+
+        for step in range(EDITS):
+            lines = edit(rng, lines)
+            contents = '\n'.join(lines) + '\n'
+
+            parser = apply(parser, contents)
+            expected = RobotFrameworkParser(self.path, contents)
+
+            self.assertEqual(snapshot(parser), snapshot(expected),
+                             'seed {0}, edit {1}:\n{2}'.format(seed, step, contents))
+
+
+    def test_update_matches_fresh_parse(self):
+        def update(parser, contents):
+            parser.update(contents)
+            return parser
+
+        for seed in range(5):
+            self.check_edits(seed, update)
+
+
+    def test_updated_matches_fresh_parse(self):
+        for seed in range(5):
+            self.check_edits(seed, lambda parser, contents: parser.updated(contents))
+
+
+    def test_updated_leaves_parser_untouched(self):
+        parser = RobotFrameworkParser(self.path, SUITE)
+        before = snapshot(parser)
+
+        rng = random.Random(0)
+        lines = SUITE.splitlines()
+        for _ in range(EDITS):
+            lines = edit(rng, lines)
+            parser.updated('\n'.join(lines) + '\n')
+
+        self.assertEqual(snapshot(parser), before)
+
+
+if __name__ == '__main__':
+    unittest.main()